@@ -0,0 +1,258 @@
+"""Benchmarks XPath generation and minimization on synthetic documents.
+
+    python -m benchmarks.bench_gen --sizes 10KB,1MB,50MB --save baseline.json
+    python -m benchmarks.bench_gen --sizes 10KB,1MB,50MB --compare baseline.json
+
+Every measurement runs in a fresh process, so peak memory of one operation isn't
+hidden by what an earlier one allocated. Peak memory is the growth of the
+process' max RSS, which, unlike tracemalloc, includes libxml2 trees. XPath
+evaluations are counted by `genxpath._stats` in the first timed run only, the
+other timed runs aren't instrumented. Operations that measure lookups in built
+indexes run once during setup, which isn't counted, so they count only the
+evaluations their memoized lookups still make.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+import gc
+import json
+import multiprocessing
+from pathlib import Path
+import platform
+import resource
+import sys
+import time
+import typing as t
+
+import lxml.etree as etree
+from parsel import Selector
+from rich.console import Console
+from rich.table import Table
+import typer
+
+from benchmarks.synth import DocShape, SyntheticDoc, generate, parse_size
+from genxpath import _gen, _stats
+from genxpath._docs import documents
+from genxpath._extract import Extractor
+from genxpath._ngrams import NgramIndex
+
+
+@dataclass
+class Measurement:
+    seconds: float
+    xpath_evals: int
+    peak_bytes: int
+
+
+def _parse(doc: SyntheticDoc) -> t.Callable[[], object]:
+    return lambda: Selector(text=doc.html)
+
+
+def _find_xpaths(doc: SyntheticDoc) -> t.Callable[[], object]:
+    def run() -> object:
+        # End to end, including parsing and indexing.
+        documents.clear()
+        return _gen.find_xpaths(doc.model, doc.html)
+
+    return run
+
+
+def _find_xpaths_for(doc: SyntheticDoc) -> t.Callable[[], object]:
+    sel = Selector(text=doc.html)
+
+    def run() -> object:
+        return _gen.find_xpaths_for(doc.model["price"], sel)
+
+    # Measure lookups in an already built index.
+    run()
+    return run
+
+
+def _ngram_index(doc: SyntheticDoc) -> t.Callable[[], object]:
+    root = Selector(text=doc.html).root
+    return lambda: NgramIndex(root)
+
+
+def _find_xpaths_containing(doc: SyntheticDoc) -> t.Callable[[], object]:
+    sel = Selector(text=doc.html)
+
+    def run() -> object:
+        return _gen.find_xpaths_for(doc.model["raw_price"], sel, match="contains")
+
+    # Measure lookups in an already built index.
+    run()
+    return run
+
+
+def _extract(doc: SyntheticDoc) -> t.Callable[[], object]:
+    # Parsing the page and applying all fields' XPaths, per page of a bulk run.
+    extractor = Extractor(_gen.find_xpaths(doc.model, doc.html))
+    return lambda: extractor.extract(doc.html)
+
+
+def _extract_fast(doc: SyntheticDoc) -> t.Callable[[], object]:
+    # Same, with XPaths generated for evaluation speed.
+    extractor = Extractor(_gen.find_xpaths(doc.model, doc.html, prefer="fast"))
+    return lambda: extractor.extract(doc.html)
+
+
+def _minimize_xpath(doc: SyntheticDoc) -> t.Callable[[], object]:
+    sel = Selector(text=doc.html)
+    price = doc.model["raw_price"]
+    el = sel.xpath(f"//*[@data-price='{price}']")[0].root
+    abs_xpath = el.getroottree().getpath(el)
+
+    def run() -> object:
+        return _gen.minimize_xpath(sel, abs_xpath)
+
+    run()
+    return run
+
+
+OPERATIONS: dict[str, t.Callable[[SyntheticDoc], t.Callable[[], object]]] = {
+    "parse": _parse,
+    "find_xpaths": _find_xpaths,
+    "find_xpaths_for": _find_xpaths_for,
+    "ngram_index": _ngram_index,
+    "find_xpaths_containing": _find_xpaths_containing,
+    "extract": _extract,
+    "extract_fast": _extract_fast,
+    "minimize_xpath": _minimize_xpath,
+}
+
+
+def main(
+    sizes: str = typer.Option("10KB,100KB,1MB,10MB,50MB", help="Document sizes"),
+    depth: int = typer.Option(10, help="Nesting depth of every product card"),
+    fanout: int = typer.Option(4, help="Elements per nesting level"),
+    unique: float = typer.Option(0.1, help="Fraction of cards with a unique id"),
+    ops: str = typer.Option(",".join(OPERATIONS), help="Operations to measure"),
+    repeat: int = typer.Option(3, help="Timing runs per operation, best is kept"),
+    save: Path | None = typer.Option(None, help="Save results as JSON"),
+    compare: Path | None = typer.Option(None, help="Compare with saved results"),
+    max_regression: float | None = typer.Option(
+        None, help="Exit with an error if any operation is this % slower"
+    ),
+):
+    shapes = [
+        DocShape(size=parse_size(size), depth=depth, fanout=fanout, unique=unique)
+        for size in sizes.split(",")
+    ]
+    op_names = ops.split(",")
+
+    results = dict[str, dict[str, Measurement]]()
+    # A fresh process per measurement.
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as pool:
+        for shape in shapes:
+            for op in op_names:
+                m = pool.submit(_measure, shape, op, repeat).result()
+                results.setdefault(shape.name, {})[op] = m
+
+    baseline = _load(compare) if compare else {}
+    regressions = _print_results(results, baseline, max_regression)
+
+    if save:
+        _save(save, results)
+
+    if regressions:
+        raise typer.Exit(1)
+
+
+def _measure(shape: DocShape, op: str, repeat: int) -> Measurement:
+    run = OPERATIONS[op](generate(shape))
+
+    gc.collect()
+    rss_before = _max_rss()
+    # Nothing done during setup is counted.
+    _stats.disable()
+    stats = _stats.enable()
+    start = time.perf_counter()
+    run()
+    times = [time.perf_counter() - start]
+    _stats.disable()
+    peak_bytes = max(0, _max_rss() - rss_before)
+    xpath_evals = stats.timings["xpath"].count if "xpath" in stats.timings else 0
+
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    return Measurement(min(times), xpath_evals, peak_bytes)
+
+
+def _max_rss() -> int:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _print_results(
+    results: dict[str, dict[str, Measurement]],
+    baseline: dict[str, dict[str, Measurement]],
+    max_regression: float | None,
+) -> list[str]:
+    table = Table("Document", "Operation", "Time", "XPath evals", "Peak memory")
+    if baseline:
+        table.add_column("vs baseline")
+
+    regressions = list[str]()
+    for doc_name, measurements in results.items():
+        for op, m in measurements.items():
+            row = [
+                doc_name,
+                op,
+                f"{m.seconds * 1000:.2f} ms",
+                str(m.xpath_evals),
+                f"{m.peak_bytes / 1024 / 1024:.1f} MB",
+            ]
+            if baseline:
+                if base := baseline.get(doc_name, {}).get(op):
+                    change = (m.seconds / base.seconds - 1) * 100
+                    row.append(f"{change:+.1f}%")
+                    if max_regression is not None and change > max_regression:
+                        regressions.append(f"{doc_name} {op}")
+                else:
+                    row.append("-")
+            table.add_row(*row)
+
+    Console().print(table)
+    for regression in regressions:
+        Console(stderr=True).print(f"[red]Regression:[/red] {regression}")
+    return regressions
+
+
+def _save(path: Path, results: dict[str, dict[str, Measurement]]) -> None:
+    path.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "python": platform.python_version(),
+                    "lxml": ".".join(map(str, etree.LXML_VERSION)),
+                    "libxml2": ".".join(map(str, etree.LIBXML_VERSION)),
+                    "machine": platform.machine(),
+                },
+                "results": {
+                    doc_name: {op: asdict(m) for op, m in measurements.items()}
+                    for doc_name, measurements in results.items()
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+def _load(path: Path) -> dict[str, dict[str, Measurement]]:
+    saved = json.loads(path.read_text())["results"]
+    return {
+        doc_name: {op: Measurement(**m) for op, m in measurements.items()}
+        for doc_name, measurements in saved.items()
+    }
+
+
+if __name__ == "__main__":
+    typer.run(main)
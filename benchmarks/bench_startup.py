@@ -0,0 +1,155 @@
+"""Benchmarks how long importing genxpath's entry points takes.
+
+    python -m benchmarks.bench_startup --save startup.json
+    python -m benchmarks.bench_startup --compare startup.json --max-regression 20
+
+Every import runs in a fresh interpreter, so nothing is imported already, and
+only the import itself is timed, not the interpreter's startup. Besides the time,
+the heavy dependencies every entry point loads are shown, tests/test_startup.py
+checks they're within budget.
+"""
+
+from dataclasses import asdict, dataclass
+import json
+from pathlib import Path
+import platform
+import subprocess
+import sys
+
+from rich.console import Console
+from rich.table import Table
+import typer
+
+ENTRY_POINTS = ("genxpath._gen", "genxpath.api", "genxpath.__main__", "genxpath.gui")
+
+# Third-party packages that take long to import.
+HEAVY_DEPENDENCIES = frozenset(
+    {
+        "cache3",
+        "lxml",
+        "parsel",
+        "patchright",
+        "playwright",
+        "prompt_toolkit",
+        "pydantic",
+        "rich",
+        "rnet",
+        "textual",
+        "typer",
+    }
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": sorted(sys.modules)}}))
+"""
+
+
+@dataclass
+class Measurement:
+    seconds: float
+    heavy_dependencies: list[str]
+
+
+def main(
+    modules: str = typer.Option(",".join(ENTRY_POINTS), help="Modules to import"),
+    repeat: int = typer.Option(5, help="Timing runs per module, best is kept"),
+    save: Path | None = typer.Option(None, help="Save results as JSON"),
+    compare: Path | None = typer.Option(None, help="Compare with saved results"),
+    max_regression: float | None = typer.Option(
+        None, help="Exit with an error if any import is this % slower"
+    ),
+    max_ms: float | None = typer.Option(
+        None, help="Exit with an error if any import takes longer"
+    ),
+):
+    results = {module: measure(module, repeat) for module in modules.split(",")}
+
+    baseline = _load(compare) if compare else {}
+    regressions = _print_results(results, baseline, max_regression, max_ms)
+
+    if save:
+        _save(save, results)
+
+    if regressions:
+        raise typer.Exit(1)
+
+
+def measure(module: str, repeat: int = 1) -> Measurement:
+    """Best time of importing the module in a fresh interpreter."""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(out))
+
+    loaded = {name.split(".")[0] for name in runs[0]["modules"]}
+    return Measurement(
+        seconds=min(run["seconds"] for run in runs),
+        heavy_dependencies=sorted(loaded & HEAVY_DEPENDENCIES),
+    )
+
+
+def _print_results(
+    results: dict[str, Measurement],
+    baseline: dict[str, Measurement],
+    max_regression: float | None,
+    max_ms: float | None,
+) -> list[str]:
+    table = Table("Module", "Import time", "Heavy dependencies")
+    if baseline:
+        table.add_column("vs baseline")
+
+    regressions = list[str]()
+    for module, m in results.items():
+        ms = m.seconds * 1000
+        row = [module, f"{ms:.1f} ms", ", ".join(m.heavy_dependencies)]
+        if max_ms is not None and ms > max_ms:
+            regressions.append(f"{module} takes {ms:.1f} ms")
+        if baseline:
+            if base := baseline.get(module):
+                change = (m.seconds / base.seconds - 1) * 100
+                row.append(f"{change:+.1f}%")
+                if max_regression is not None and change > max_regression:
+                    regressions.append(f"{module} {change:+.1f}%")
+                if added := set(m.heavy_dependencies) - set(base.heavy_dependencies):
+                    regressions.append(f"{module} imports {', '.join(sorted(added))}")
+            else:
+                row.append("-")
+        table.add_row(*row)
+
+    Console().print(table)
+    for regression in regressions:
+        Console(stderr=True).print(f"[red]Regression:[/red] {regression}")
+    return regressions
+
+
+def _save(path: Path, results: dict[str, Measurement]) -> None:
+    path.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                },
+                "results": {module: asdict(m) for module, m in results.items()},
+            },
+            indent=2,
+        )
+    )
+
+
+def _load(path: Path) -> dict[str, Measurement]:
+    saved = json.loads(path.read_text())["results"]
+    return {module: Measurement(**m) for module, m in saved.items()}
+
+
+if __name__ == "__main__":
+    typer.run(main)
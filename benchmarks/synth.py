@@ -0,0 +1,93 @@
+"""Synthetic HTML documents for benchmarks."""
+
+from dataclasses import dataclass
+import random
+
+
+@dataclass(frozen=True)
+class DocShape:
+    """How the generated document looks.
+
+    The page is a list of product cards. Each card nests `depth` levels deep with
+    `fanout` elements per level, and `unique` is the fraction of cards that have a
+    unique id to anchor XPaths on.
+    """
+
+    size: int
+    depth: int = 10
+    fanout: int = 4
+    unique: float = 0.1
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{_fmt_size(self.size)}-d{self.depth}-f{self.fanout}-u{self.unique:g}"
+
+
+@dataclass
+class SyntheticDoc:
+    html: str
+    # Sample values of a card in the middle of the page.
+    model: dict[str, str]
+
+
+def generate(shape: DocShape) -> SyntheticDoc:
+    rng = random.Random(shape.seed)
+    parts = ["<html><head><title>Products</title></head><body><main>"]
+    size = len(parts[0])
+
+    i = 0
+    while size < shape.size:
+        card = _card(i, shape, rng)
+        parts.append(card)
+        size += len(card)
+        i += 1
+
+    parts.append("</main></body></html>")
+    target = i // 2
+    return SyntheticDoc(
+        html="".join(parts),
+        model={
+            "title": f"Product {target}",
+            "price": f"€{target}.99",
+            "raw_price": f"{target}.99",
+        },
+    )
+
+
+def _card(i: int, shape: DocShape, rng: random.Random) -> str:
+    card_id = f' id="card-{i}"' if rng.random() < shape.unique else ""
+    parts = [f'<div class="card"{card_id}>']
+
+    for level in range(shape.depth):
+        parts.append(f'<div class="level-{level}">')
+        for sibling in range(shape.fanout - 1):
+            parts.append(f'<span class="meta">{rng.choice(_WORDS)} {sibling}</span>')
+
+    parts.append(
+        f'<h2 class="title">Product {i}</h2>'
+        f'<span class="price" data-price="{i}.99">€{i}.99</span>'
+    )
+    parts.append("</div>" * shape.depth)
+    parts.append("</div>")
+    return "".join(parts)
+
+
+_WORDS = ["new", "sale", "in stock", "free shipping", "bestseller", "eco"]
+
+
+def parse_size(size: str) -> int:
+    """e.g. "10KB" -> 10240"""
+    size = size.strip().upper()
+    for suffix, factor in (("MB", 1024 * 1024), ("KB", 1024), ("B", 1)):
+        if size.endswith(suffix):
+            return int(float(size[: -len(suffix)]) * factor)
+    return int(size)
+
+
+def _fmt_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:g}MB"
+    if size >= 1024:
+        return f"{size / 1024:g}KB"
+    return f"{size}B"
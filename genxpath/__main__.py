@@ -1,87 +1,274 @@
 import typer
-from parsel import Selector
+from typer.core import TyperGroup
 from pathlib import Path
-import rich
-from rich.console import Console
-from rich.logging import RichHandler
+import asyncio
+from collections import deque
+from enum import Enum
+import json
+import os
+import sys
+import time
+import typing as t
 import logging
-from prompt_toolkit import PromptSession
-from prompt_toolkit.history import InMemoryHistory
-from prompt_toolkit.completion import WordCompleter
-from cache3 import DiskCache
 
-from genxpath._io import http_get
-from genxpath._gen import find_xpaths_for, minimize_xpath
+from genxpath import _stats
+from genxpath.api import API_CACHE_MB, API_PORT, serve
+from genxpath._batch import run_batch
+from genxpath._browser import RENDER_PAGES, RenderPool, WaitUntil
+from genxpath._docs import documents
+from genxpath._extract import extract_many
+from genxpath._io import MAX_REQUESTS_PER_HOST
+from genxpath._gen import Prefer, find_xpaths_batch
+from genxpath._stream import stream_find_xpaths
 
+# Heavy dependencies are imported only by the commands that use them, so short
+# invocations in scripts start fast, see benchmarks/bench_startup.py.
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(console=Console(), rich_tracebacks=True)],
-)
 
+class _ShellByDefault(TyperGroup):
+    """Runs the shell for a bare URL or path, as in `python -m genxpath <url>`."""
 
-def main(url: str):
-    cache = DiskCache("cache")
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and not args[0].startswith("-"):
+            args = ["shell", *args]
+        return super().parse_args(ctx, args)
 
-    if url.startswith("https://"):
-        html_doc = http_get(url, cache)
-    else:
-        html_doc = Path(url).read_text()
 
-    _run_shell(html_doc)
+app = typer.Typer(cls=_ShellByDefault)
+
+
+class WaitUntilChoice(str, Enum):
+    """`WaitUntil` load states for render --wait-until, typer doesn't take literals."""
+
+    commit = "commit"
+    domcontentloaded = "domcontentloaded"
+    load = "load"
+    networkidle = "networkidle"
+
+
+@app.callback()
+def main():
+    # Imported here rather than at the top, so importing this module doesn't
+    # load rich. Typer's --help formatting loads it anyway when it's installed.
+    from rich.console import Console
+    from rich.logging import RichHandler
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(console=Console(), rich_tracebacks=True)],
+    )
+
+
+@app.command()
+def shell(
+    url: str,
+    stats: bool = typer.Option(
+        False, help="Collect timings from the start, see the stats command"
+    ),
+    cache_mb: int | None = typer.Option(
+        None, help="Memory budget for parsed documents, default: GENXPATH_DOC_CACHE_MB"
+    ),
+):
+    """Interactive shell to query, minimize and find XPaths in documents.
+
+    The document at `url` is loaded as "main", more can be loaded with `load`.
+    `python -m genxpath <url>` runs it too.
+    """
+    if stats:
+        _stats.enable()
+    if cache_mb is not None:
+        documents.max_bytes = cache_mb * 1024 * 1024
+
+    from cache3 import DiskCache
+
+    from genxpath._session import Session
+    from genxpath._shell import run_shell
+
+    session = Session(DiskCache("cache"))
+    session.load("main", url)
+    run_shell(session)
+
+
+@app.command()
+def find(
+    model: Path = typer.Option(
+        ..., help="JSON file mapping field names to sample values"
+    ),
+    paths: list[Path] = typer.Argument(..., help="HTML files to find XPaths in"),
+    workers: int | None = typer.Option(None, help="Worker processes, default: CPUs"),
+    stream: bool = typer.Option(
+        False, help="Parse incrementally with bounded memory, for huge files"
+    ),
+    prefer: str = typer.Option(
+        "short", help="short, or fast XPaths to extract with, e.g. id() lookups"
+    ),
+):
+    """Finds XPaths to model fields in many HTML files, one JSON line per file."""
+    model_ = json.loads(model.read_text())
+    if prefer not in t.get_args(Prefer):
+        raise typer.BadParameter(f"Invalid --prefer: {prefer}")
+    if stream and prefer != "short":
+        raise typer.BadParameter("--stream only finds the shortest XPaths")
+    if stream:
+        for path in paths:
+            found = stream_find_xpaths(model_, path)
+            xpaths = {f: [x.xpath for x in xs] for f, xs in found.items()}
+            abs_xpaths = {f: [x.abs_xpath for x in xs] for f, xs in found.items()}
+            print(
+                json.dumps(
+                    {"path": str(path), "xpaths": xpaths, "abs_xpaths": abs_xpaths}
+                ),
+                flush=True,
+            )
+        return
+
+    results = find_xpaths_batch(
+        [(model_, path) for path in paths],
+        workers=workers,
+        prefer=t.cast(Prefer, prefer),
+    )
+    for path, xpaths in zip(paths, results):
+        print(json.dumps({"path": str(path), "xpaths": xpaths}), flush=True)
+
 
+@app.command()
+def extract(
+    xpaths: Path = typer.Option(
+        ..., help="JSON file mapping field names to XPaths, e.g. from find"
+    ),
+    paths: list[Path] | None = typer.Argument(
+        None, help="HTML files to extract from, read from stdin if not given"
+    ),
+    workers: int | None = typer.Option(None, help="Worker processes, default: CPUs"),
+):
+    """Extracts fields from many HTML files, one JSON line per file, in order.
 
-def _run_shell(html_doc: str):
-    doc = Selector(text=html_doc)
+    Then logs pages per second per worker.
+    """
+    field_xpaths = {
+        field: [xs] if isinstance(xs, str) else xs
+        for field, xs in json.loads(xpaths.read_text()).items()
+    }
+    if not paths:
+        paths_ = (Path(line.strip()) for line in sys.stdin if line.strip())
+    else:
+        paths_ = iter(paths)
+
+    # Paths sent for extraction, records come back in the same order.
+    pending = deque[Path]()
 
-    _print_help()
-    history = InMemoryHistory()
-    auto_complete = WordCompleter(["q", "m", "f"])
-    shell_session = PromptSession[str](history=history, completer=auto_complete)
+    def read_paths() -> t.Iterator[Path]:
+        for path in paths_:
+            pending.append(path)
+            yield path
 
-    while True:
-        prompt = shell_session.prompt("> ")
-        if prompt == "d":
-            cmd = "d"
-            args = ""
-        elif " " in prompt:
-            cmd, args = prompt.split(maxsplit=1)
+    workers = workers or os.cpu_count() or 1
+    started = time.monotonic()
+    extracted = 0
+    for record in extract_many(field_xpaths, read_paths(), workers=workers):
+        path = str(pending.popleft())
+        if isinstance(record, Exception):
+            print(json.dumps({"path": path, "error": str(record)}), flush=True)
         else:
-            _print_help()
-            continue
-
-        match cmd:
-            case "q":
-                _query_xpath(doc, args)
-            case "m":
-                print(minimize_xpath(doc, args))
-            case "f":
-                for xpath in find_xpaths_for(args, doc):
-                    print(xpath)
-            case "d":
-                rich.print(html_doc)
-            case _:
-                logging.error(f"Invalid command: {cmd}")
-
-
-def _print_help():
-    print("HELP:")
-    print("   q - query xpath")
-    print("   m - minimize xpath")
-    print("   f - find xpath by value")
-    print("   d - print loaded document")
-
-
-def _query_xpath(doc: Selector, xpath: str):
-    try:
-        elements = doc.xpath(xpath)
-        for i, el in enumerate(elements):
-            rich.print(f"{i}: {el.get()}")
-    except ValueError:
-        logging.error(f"Invalid XPath: {xpath}")
+            print(json.dumps({"path": path, "record": record}), flush=True)
+        extracted += 1
+    elapsed = time.monotonic() - started
+
+    if extracted:
+        logging.info(
+            f"Extracted {extracted} pages in {elapsed:.1f}s, "
+            f"{extracted / elapsed / workers:.1f} pages per second per worker"
+        )
+
+
+@app.command()
+def batch(
+    workers: int | None = typer.Option(None, help="Worker processes, default: CPUs"),
+    max_in_flight: int | None = typer.Option(
+        None, help="Jobs fetched or processed at once, default: 4 per worker"
+    ),
+    max_per_host: int = typer.Option(
+        MAX_REQUESTS_PER_HOST, help="Concurrent requests to the same host"
+    ),
+):
+    """Reads JSONL jobs from stdin, writes one JSON line per job as it finishes.
+
+    A job is {"url": ..., "model": {...}} or {"path": ..., "model": {...}}.
+    """
+    from cache3 import DiskCache
+
+    asyncio.run(
+        run_batch(
+            sys.stdin,
+            DiskCache("cache"),
+            lambda line: print(line, flush=True),
+            workers=workers,
+            max_in_flight=max_in_flight,
+            max_per_host=max_per_host,
+        )
+    )
+
+
+@app.command()
+def api(
+    port: int = typer.Option(API_PORT, help="Port to listen on"),
+    host: str = typer.Option("127.0.0.1", help="Address to listen on"),
+    workers: int | None = typer.Option(None, help="Worker processes, default: CPUs"),
+    cache_mb: int = typer.Option(
+        API_CACHE_MB, help="Memory budget for parsed documents, in MB"
+    ),
+):
+    """Serves the local HTTP JSON API: /load, /find, /minimize and /query."""
+    serve(host, port, workers, cache_mb)
+
+
+@app.command()
+def render(
+    pages: int = typer.Option(RENDER_PAGES, help="Pages rendered at once"),
+    wait_until: WaitUntilChoice = typer.Option(
+        WaitUntilChoice.load, help="Load state to wait for"
+    ),
+    wait_for: str | None = typer.Option(
+        None, help="Selector of an element to wait for, e.g. xpath=//table"
+    ),
+):
+    """Renders URLs from stdin in a headless browser into the cache.
+
+    Writes one JSON line per URL as it finishes, then logs pages per minute.
+    """
+    from cache3 import DiskCache
+
+    pool = RenderPool(
+        DiskCache("cache"),
+        pages=pages,
+        wait_until=t.cast(WaitUntil, wait_until.value),
+        wait_for=wait_for,
+    )
+    urls = [line.strip() for line in sys.stdin if line.strip()]
+    if urls:
+        asyncio.run(_render_urls(pool, urls))
+
+
+async def _render_urls(pool: RenderPool, urls: list[str]) -> None:
+    async def render_one(url: str) -> dict[str, t.Any]:
+        try:
+            return {"url": url, "bytes": len(await pool.render(url))}
+        except Exception as e:
+            return {"url": url, "error": str(e)}
+
+    async with pool:
+        started = time.monotonic()
+        for result in asyncio.as_completed([render_one(url) for url in urls]):
+            print(json.dumps(await result), flush=True)
+        elapsed = time.monotonic() - started
+
+    logging.info(
+        f"Rendered {len(urls)} pages in {elapsed:.1f}s, "
+        f"{len(urls) / elapsed * 60:.0f} pages per minute"
+    )
 
 
 if __name__ == "__main__":
-    typer.run(main)
+    app()
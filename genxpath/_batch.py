@@ -0,0 +1,96 @@
+"""XPath generation over a stream of JSONL jobs, for Unix pipelines.
+
+Every job is a JSON object with a `model` and either a `url` or a `path`, e.g.
+`{"url": "https://example.com", "model": {"title": "Example Domain"}}`.
+"""
+
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import os
+from pathlib import Path
+import typing as t
+from urllib.parse import urlsplit
+
+
+from genxpath._gen import _find_xpaths_job
+from genxpath._io import MAX_REQUESTS_PER_HOST, fetch
+
+if t.TYPE_CHECKING:
+    from cache3 import DiskCache
+
+
+async def run_batch(
+    lines: t.Iterable[str],
+    cache: "DiskCache",
+    write: t.Callable[[str], None],
+    workers: int | None = None,
+    max_in_flight: int | None = None,
+    max_per_host: int = MAX_REQUESTS_PER_HOST,
+) -> None:
+    """Runs every job and writes one JSON line per job as soon as it's done.
+
+    Results are in completion order, each has the job's input line number. A job
+    that fails gets an `error` instead of `xpaths`. At most `max_in_flight` jobs
+    are fetched or processed at once, and no more input is read until one of them
+    is written out, so a slow reader of the output slows down the whole batch.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Enough to keep all workers busy while pages are being downloaded.
+    in_flight = asyncio.Semaphore(max_in_flight or workers * 4)
+    host_limits = defaultdict[str, asyncio.Semaphore](
+        lambda: asyncio.Semaphore(max_per_host)
+    )
+    loop = asyncio.get_running_loop()
+
+    async def run_job(line_nr: int, line: str, pool: ProcessPoolExecutor) -> None:
+        result: dict[str, t.Any] = {"line": line_nr}
+        try:
+            job = json.loads(line)
+            model, html_doc = _parse_job(job)
+            result |= {k: job[k] for k in ("url", "path") if k in job}
+            if isinstance(html_doc, str):
+                async with host_limits[urlsplit(html_doc).netloc]:
+                    html_doc = await fetch(html_doc, cache)
+
+            result["xpaths"] = await loop.run_in_executor(
+                pool, _find_xpaths_job, (model, html_doc)
+            )
+        except Exception as e:
+            result["error"] = str(e) or type(e).__name__
+
+        write(json.dumps(result))
+
+    tasks = set[asyncio.Task[None]]()
+    lines = iter(lines)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for line_nr in itertools.count(1):
+            await in_flight.acquire()
+            # Don't block fetches while waiting for the next job.
+            line = await asyncio.to_thread(next, lines, None)
+            if line is None:
+                break
+            if not line.strip():
+                in_flight.release()
+                continue
+
+            task = asyncio.create_task(run_job(line_nr, line, pool))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _: in_flight.release())
+
+        await asyncio.gather(*tasks)
+
+
+def _parse_job(job: t.Any) -> tuple[dict[str, str], str | Path]:
+    """Returns the model and the URL or the file path of the document."""
+    if not isinstance(job, dict) or not isinstance(job.get("model"), dict):
+        raise ValueError("Job must be an object with a model")
+
+    if "url" in job:
+        return job["model"], str(job["url"])
+    if "path" in job:
+        return job["model"], Path(job["path"])
+    raise ValueError("Job must have a url or a path")
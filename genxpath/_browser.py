@@ -1,10 +1,29 @@
 """Web browser utils for interactive XPath generation."""
 
+import asyncio
 from asyncio import Queue
+from dataclasses import dataclass
 import typing as t
 from typing import TypedDict
 
-from patchright.async_api import async_playwright, Page
+from genxpath import _stats
+from genxpath._dom_sync import DomChange
+from genxpath._io import FetchError, cached_html, store_html
+
+if t.TYPE_CHECKING:
+    from cache3 import DiskCache
+    from patchright.async_api import BrowserContext, Page, Route
+
+# Pages `RenderPool` renders at once by default.
+RENDER_PAGES = 4
+# A context is replaced after rendering this many pages, to free what they leak.
+RECYCLE_AFTER_PAGES = 50
+
+# Requests for these aren't needed to build the DOM, so a render skips them.
+_BLOCKED_RESOURCES = frozenset({"image", "font", "media"})
+
+# Page load states a render can wait for, see Playwright's `Page.goto()`.
+WaitUntil = t.Literal["commit", "domcontentloaded", "load", "networkidle"]
 
 # Some JavaScript utils to be run on a Web browser to communicate with Python.
 _JS_INIT = """
@@ -30,20 +49,198 @@ _JS_INIT = """
         return '/' + path.join('/');
     }
 
-    function addHoverBorder(event) {
-        event.target.style.border = "2px solid red";
-        event.target.addEventListener("mouseout", removeHoverBorder);
+    // Only the latest hovered element is reported, at most once per frame.
+    let hovered = null;
+    let seq = 0;
 
-        pyEmitEvent({"event": "element_hover", "xpath": getXPath(event.target)});
+    function emitHover() {
+        const element = hovered;
+        hovered = null;
+        pyEmitEvent({
+            "event": "element_hover", "xpath": getXPath(element), "seq": ++seq,
+        });
     }
 
-    function removeHoverBorder(event) {
+    // A single listener on the document, instead of one on every element.
+    document.addEventListener("mouseover", event => {
+        event.target.style.border = "2px solid red";
+        if (hovered === null) {
+            requestAnimationFrame(emitHover);
+        }
+        hovered = event.target;
+    }, true);
+
+    document.addEventListener("mouseout", event => {
         event.target.style.border = '';
+    }, true);
+
+    const style = document.createElement("style");
+    style.textContent = "* { cursor: crosshair !important; }";
+    (document.head || document.documentElement).appendChild(style);
+}
+"""
+
+# Sends the page's HTML once and then only what changes in it, see `_dom_sync`.
+# Running it again starts over with a fresh copy of the HTML.
+_JS_OBSERVE = """
+() => {
+    const FLUSH_DELAY_MS = 100;
+
+    const previous = window.__genxpathSync;
+    if (previous) {
+        previous.observer.disconnect();
+        clearTimeout(previous.timer);
+    }
+    const sync = window.__genxpathSync = {
+        observer: null,
+        timer: null,
+        records: [],
+        // Each event is sent after the previous one is received, to keep the order.
+        sending: previous ? previous.sending : Promise.resolve(),
+    };
+
+    function send(event) {
+        sync.sending = sync.sending.then(() => pyEmitEvent(event));
+    }
+
+    function sendHtml() {
+        const doctype = document.doctype
+            ? new XMLSerializer().serializeToString(document.doctype) : "";
+        send({
+            "event": "html_loaded",
+            "html": doctype + document.documentElement.outerHTML,
+        });
+    }
+
+    // Child element indices from the root element.
+    function elementPath(element) {
+        const path = [];
+        const root = document.documentElement;
+        for (; element !== root; element = element.parentElement) {
+            const siblings = element.parentElement.children;
+            path.push(Array.prototype.indexOf.call(siblings, element));
+        }
+        return path.reverse();
+    }
+
+    function isInsertion(record) {
+        return record.removedNodes.length === 0 && Array.prototype.every.call(
+            record.addedNodes,
+            node => node.nodeType === Node.ELEMENT_NODE
+                || (node.nodeType === Node.TEXT_NODE && !node.data.trim()),
+        );
+    }
+
+    function domChanges(records) {
+        // Elements whose whole content is sent.
+        const replaced = new Set();
+        // Elements added to a parent that only had elements added.
+        const inserted = new Set();
+        const withAttributes = new Set();
+        for (const record of records) {
+            if (record.type === "attributes") {
+                // The hover highlight sets it, and styles aren't used for XPaths.
+                if (record.attributeName !== "style") {
+                    withAttributes.add(record.target);
+                }
+            } else if (record.type === "characterData") {
+                if (record.target.parentElement) {
+                    replaced.add(record.target.parentElement);
+                }
+            } else if (isInsertion(record)) {
+                for (const node of record.addedNodes) {
+                    if (node.nodeType === Node.ELEMENT_NODE) {
+                        inserted.add(node);
+                    }
+                }
+            } else {
+                replaced.add(record.target);
+            }
+        }
+
+        // Detached elements and the ones inside the sent HTML need no changes.
+        function isSent(element) {
+            if (!element.isConnected) {
+                return true;
+            }
+            for (let el = element.parentElement; el; el = el.parentElement) {
+                if (replaced.has(el) || inserted.has(el)) {
+                    return true;
+                }
+            }
+            return false;
+        }
+
+        const changes = [];
+        for (const element of replaced) {
+            if (!isSent(element)) {
+                changes.push([element, {
+                    "op": "children",
+                    "path": elementPath(element),
+                    "html": element.innerHTML,
+                }]);
+            }
+        }
+        for (const element of inserted) {
+            if (!isSent(element)) {
+                const parent = element.parentElement;
+                changes.push([element, {
+                    "op": "insert",
+                    "path": elementPath(parent),
+                    "index": Array.prototype.indexOf.call(parent.children, element),
+                    "html": element.outerHTML,
+                }]);
+            }
+        }
+        for (const element of withAttributes) {
+            if (!isSent(element) && !inserted.has(element)) {
+                const attrs = {};
+                for (const attr of element.attributes) {
+                    attrs[attr.name] = attr.value;
+                }
+                changes.push([element, {
+                    "op": "attrs", "path": elementPath(element), "attrs": attrs,
+                }]);
+            }
+        }
+
+        // Paths are as of now, applying changes in document order keeps them valid.
+        changes.sort(([a], [b]) => {
+            if (a === b) {
+                return 0;
+            }
+            const following = Node.DOCUMENT_POSITION_FOLLOWING;
+            return a.compareDocumentPosition(b) & following ? -1 : 1;
+        });
+        return changes.map(([, change]) => change);
     }
 
-    document.querySelectorAll('*').forEach(element => {
-        element.style.cursor = 'crosshair';
-        element.addEventListener('mouseover', addHoverBorder);
+    function flush() {
+        sync.timer = null;
+        const records = sync.records.concat(sync.observer.takeRecords());
+        sync.records = [];
+
+        // The root element itself was replaced.
+        if (records.some(record => record.target === document)) {
+            sendHtml();
+            return;
+        }
+        const changes = domChanges(records);
+        if (changes.length > 0) {
+            send({"event": "dom_changed", "changes": changes});
+        }
+    }
+
+    sync.observer = new MutationObserver(records => {
+        sync.records.push(...records);
+        if (sync.timer === null) {
+            sync.timer = setTimeout(flush, FLUSH_DELAY_MS);
+        }
+    });
+    // Together, so that no change is missed between the two.
+    sendHtml();
+    sync.observer.observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true,
     });
 }
 """
@@ -52,6 +249,8 @@ _JS_INIT = """
 class ElementHoverEvent(TypedDict):
     event: t.Literal["element_hover"]
     xpath: str
+    # Increases with every hover on the same page.
+    seq: int
 
 
 class HtmlLoadedEvent(TypedDict):
@@ -59,29 +258,63 @@ class HtmlLoadedEvent(TypedDict):
     html: str
 
 
+class DomChangedEvent(TypedDict):
+    event: t.Literal["dom_changed"]
+    # To be applied in order, see `_dom_sync.apply_dom_changes()`.
+    changes: list[DomChange]
+
+
+BrowserEvent = ElementHoverEvent | HtmlLoadedEvent | DomChangedEvent
+
+
 class WebBrowser:
     def __init__(self):
         self._page = None
         self._browser = None
         self._playwright = None
 
-        self.events: Queue[ElementHoverEvent | HtmlLoadedEvent] = Queue()
+        self.events: Queue[BrowserEvent] = Queue()
+        self._last_hover_seq = 0
 
     async def start(self) -> None:
+        # patchright is slow to import, so only once a browser is opened.
+        from patchright.async_api import async_playwright
+
         self._playwright = await async_playwright().__aenter__()
         self._browser = await self._playwright.chromium.launch(headless=False)
         self._page = await self._browser.new_page()
         self._page.on("load", lambda page: page.evaluate(_JS_INIT))
-
-        async def on_html_loaded(page: Page):
-            html = await page.content()
-            await self.events.put({"event": "html_loaded", "html": html})
-
-        self._page.on("domcontentloaded", lambda page: on_html_loaded(page))
+        self._page.on("domcontentloaded", lambda page: page.evaluate(_JS_OBSERVE))
         await self._page.expose_function(
             "pyEmitEvent", lambda event: self.events.put(event)
         )
 
+    async def next_event(self) -> BrowserEvent:
+        """Waits for the next event, skipping hovers that are already stale.
+
+        Only the latest of the queued up hovers is returned, and hovers queued
+        before a page load are dropped. Other events are never skipped.
+        """
+        while True:
+            event = await self.events.get()
+            while event["event"] == "element_hover" and not self.events.empty():
+                event = self.events.get_nowait()
+
+            if event["event"] == "html_loaded":
+                self._last_hover_seq = 0
+                return event
+            if event["event"] == "dom_changed":
+                return event
+            # Calls from the page may be delivered out of order.
+            if event["seq"] > self._last_hover_seq:
+                self._last_hover_seq = event["seq"]
+                return event
+
+    async def resync(self) -> None:
+        """Sends the page's whole HTML again, once the changes can't be applied."""
+        assert self._page is not None
+        await self._page.evaluate(_JS_OBSERVE)
+
     async def stop(self) -> None:
         if self._page is not None:
             await self._page.close()
@@ -102,3 +335,144 @@ class WebBrowser:
         html_doc = await self._page.content()
 
         return html_doc
+
+
+@dataclass
+class _RenderSlot:
+    context: "BrowserContext"
+    page: "Page"
+    rendered: int = 0
+
+
+class RenderPool:
+    """Renders pages that need JavaScript in a headless browser, in bulk.
+
+    A fixed number of pages is reused for all renders, each in its own context,
+    which is replaced every `recycle_after` pages to keep memory bounded. Rendered
+    HTML is stored in the same cache as `_io.http_get()`'s.
+
+        async with RenderPool(cache) as pool:
+            html_docs = await pool.render_many(urls)
+    """
+
+    def __init__(
+        self,
+        cache: "DiskCache",
+        pages: int = RENDER_PAGES,
+        wait_until: WaitUntil = "load",
+        wait_for: str | None = None,
+        timeout_seconds: float = 30,
+        recycle_after: int = RECYCLE_AFTER_PAGES,
+    ):
+        """
+        Args:
+            wait_until: load state to wait for after navigating.
+            wait_for: then also wait for an element matching this selector, e.g.
+                "#results" or "xpath=//table".
+        """
+        self.cache = cache
+        self.pages = pages
+        self.wait_until: WaitUntil = wait_until
+        self.wait_for = wait_for
+        self.timeout_seconds = timeout_seconds
+        self.recycle_after = recycle_after
+
+        self._playwright = None
+        self._browser = None
+        self._slots = Queue[_RenderSlot]()
+
+    async def __aenter__(self) -> "RenderPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        from patchright.async_api import async_playwright
+
+        self._playwright = await async_playwright().__aenter__()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        for _ in range(self.pages):
+            self._slots.put_nowait(await self._new_slot())
+
+    async def stop(self) -> None:
+        while not self._slots.empty():
+            await self._slots.get_nowait().context.close()
+
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def render(self, url: str) -> str:
+        """The page's HTML once it's ready, from the cache if it was rendered and
+        is still fresh.
+        """
+        if (html_doc := cached_html(url, self.cache, rendered=True)) is not None:
+            _stats.count("render.cache_hits")
+            return html_doc
+
+        slot = await self._slots.get()
+        try:
+            if slot.rendered >= self.recycle_after:
+                slot = await self._recycle(slot)
+            with _stats.span("render", url=url):
+                html_doc = await self._render(slot.page, url)
+            slot.rendered += 1
+        except BaseException:
+            # The page may be left in any state, start over with a fresh one.
+            slot.rendered = self.recycle_after
+            raise
+        finally:
+            self._slots.put_nowait(slot)
+
+        store_html(url, self.cache, html_doc, rendered=True)
+        return html_doc
+
+    async def render_many(self, urls: t.Iterable[str]) -> list[str | BaseException]:
+        """Renders all URLs, as many at a time as there are pages.
+
+        Results are in the same order as `urls`. A failed render is returned as
+        the exception instead of failing the whole batch.
+        """
+        return await asyncio.gather(
+            *(self.render(url) for url in urls), return_exceptions=True
+        )
+
+    async def _render(self, page: "Page", url: str) -> str:
+        timeout_ms = self.timeout_seconds * 1000
+        resp = await page.goto(url, wait_until=self.wait_until, timeout=timeout_ms)
+        if resp is not None and resp.status != 200:
+            raise FetchError(f"GET {url} failed with HTTP {resp.status}")
+        if self.wait_for is not None:
+            await page.wait_for_selector(
+                self.wait_for, state="attached", timeout=timeout_ms
+            )
+        return await page.content()
+
+    async def _new_slot(self) -> _RenderSlot:
+        assert self._browser is not None
+
+        context = await self._browser.new_context()
+        await context.route("**/*", _block_heavy_resources)
+        return _RenderSlot(context, await context.new_page())
+
+    async def _recycle(self, slot: _RenderSlot) -> _RenderSlot:
+        _stats.count("render.recycled_contexts")
+        try:
+            await slot.context.close()
+        except Exception:
+            # Already gone with a crashed page, nothing to free.
+            pass
+        return await self._new_slot()
+
+
+async def _block_heavy_resources(route: "Route") -> None:
+    if route.request.resource_type in _BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
@@ -1,8 +1,11 @@
 from datetime import timedelta
+import heapq
+import os
 import typing as t
 import time
 from pathlib import Path
-from pydantic import BaseModel, Field
+import weakref
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class CacheEntry(BaseModel):
@@ -10,38 +13,155 @@ class CacheEntry(BaseModel):
     expires_at: int
 
 
+class _LogRecord(CacheEntry):
+    key: str
+
+
 class Cache(BaseModel):
     """A cache for the data sources.
 
     e.g. some data sources will make requests to external APIs, like weather forecast.
     To avoid making the same request multiple times, we can cache the results.
+
+    The file is an append-only log with one JSON record per `set()`. Records are
+    written in batches and the log is compacted once most of it is overwritten or
+    expired entries. Other instances loading the same file only see what was
+    written, use `flush()` or `with` to write pending records right away. They're
+    also written when the cache is garbage collected and at exit.
     """
 
     data: dict[str, CacheEntry]
     path: Path = Field(exclude=True, default_factory=lambda: Path.cwd() / "cache.json")
 
+    # Write pending records once there are this many or they are this old.
+    flush_every: int = Field(exclude=True, default=64)
+    flush_interval: timedelta = Field(exclude=True, default=timedelta(seconds=1))
+    # Evict the entries closest to expiry once there are more than this.
+    max_entries: int | None = Field(exclude=True, default=None)
+
+    # Shared with the finalizer, so it's only ever changed in place.
+    _pending: list[str] = PrivateAttr(default_factory=list)
+    _last_flush: float = PrivateAttr(default_factory=time.monotonic)
+    _log_records: int = PrivateAttr(default=0)
+
     @classmethod
-    def load(cls, path: str) -> t.Self:
+    def load(cls, path: str, **options: t.Any) -> t.Self:
         path_ = Path(path)
+        cache = cls(data={}, path=path_, **options)
         if path_.exists():
-            return cls.model_validate_json(path_.read_bytes())
+            cache._read_log()
+        return cache
 
-        return cls(data={}, path=path_)
+    def model_post_init(self, context: t.Any, /) -> None:
+        # Pending records are written when the cache is garbage collected or at
+        # exit, the finalizer doesn't keep the cache alive.
+        weakref.finalize(self, _write_records, self.path, self._pending)
 
     def get(self, key: str) -> str | None:
         if not (entry := self.data.get(key)):
             return None
 
         if entry.expires_at < time.time():
+            del self.data[key]
             return None
 
         return entry.value
 
     def set(self, key: str, value: str, expires_in: timedelta) -> None:
-        self.data[key] = CacheEntry(
+        entry = CacheEntry(
             value=value, expires_at=int(time.time() + expires_in.total_seconds())
         )
-        self._persist()
+        self.data[key] = entry
+        self._append(key, entry)
+
+        if self.max_entries is not None and len(self.data) > self.max_entries:
+            self._evict(self.max_entries)
+
+        if (
+            len(self._pending) >= self.flush_every
+            or time.monotonic() - self._last_flush
+            >= self.flush_interval.total_seconds()
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes pending records to the file, compacting it if needed."""
+        _write_records(self.path, self._pending)
+        self._last_flush = time.monotonic()
+
+        # Most records are garbage - rewrite just the live entries.
+        if self._log_records > max(2 * len(self.data), 1024):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the file with just the live entries."""
+        now = time.time()
+        self.data = {k: e for k, e in self.data.items() if e.expires_at >= now}
+        self._pending[:] = [_record(k, e) for k, e in self.data.items()]
+        self._log_records = len(self._pending)
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            f.writelines(self._pending)
+        os.replace(tmp_path, self.path)
+        self._pending.clear()
+
+    def __enter__(self) -> t.Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.flush()
+
+    def _append(self, key: str, entry: CacheEntry) -> None:
+        self._pending.append(_record(key, entry))
+        self._log_records += 1
+
+    def _evict(self, max_entries: int) -> None:
+        # Evict a bit more than needed, so it doesn't happen on every set().
+        evict_count = len(self.data) - max_entries * 9 // 10
+        for key in heapq.nsmallest(
+            evict_count, self.data, key=lambda k: self.data[k].expires_at
+        ):
+            del self.data[key]
+            # An already expired record works as a tombstone.
+            self._append(key, CacheEntry(value=None, expires_at=0))
+
+    def _read_log(self) -> None:
+        content = self.path.read_bytes()
+        if content.startswith(b"{\n"):
+            # Whole file JSON written by older versions.
+            self.data = type(self).model_validate_json(content).data
+            self.compact()
+            return
+
+        now = time.time()
+        for line in content.splitlines():
+            self._log_records += 1
+            try:
+                record = _LogRecord.model_validate_json(line)
+            except ValueError:
+                # Torn write at the end of the log.
+                continue
+
+            if record.expires_at < now:
+                self.data.pop(record.key, None)
+            else:
+                self.data[record.key] = CacheEntry(
+                    value=record.value, expires_at=record.expires_at
+                )
+
+        if not content.endswith(b"\n"):
+            # Don't append records to a torn line.
+            self.compact()
+
+
+def _write_records(path: Path, records: list[str]) -> None:
+    if records:
+        with path.open("a", encoding="utf-8") as f:
+            f.writelines(records)
+        records.clear()
+
 
-    def _persist(self) -> None:
-        self.path.write_bytes(self.model_dump_json(indent=2).encode("utf-8"))
+def _record(key: str, entry: CacheEntry) -> str:
+    record = _LogRecord(key=key, value=entry.value, expires_at=entry.expires_at)
+    return record.model_dump_json() + "\n"
@@ -0,0 +1,85 @@
+"""Parsed HTML documents shared by the library, the CLI and the GUI.
+
+Parsing a big page takes much longer than hashing it, so documents are cached by
+content hash: loading the same HTML again returns the already parsed tree.
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+from threading import Lock
+
+from parsel import Selector
+
+from genxpath import _stats
+
+# Rough memory use of a parsed tree, with its index, relative to the HTML size.
+_PARSED_SIZE_FACTOR = 10
+
+
+class DocumentCache:
+    """LRU of parsed documents, evicted once their estimated size exceeds a budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+        self._docs = OrderedDict[bytes, tuple[Selector, int]]()
+        self._size = 0
+        self._lock = Lock()
+
+    def parse(self, html: str) -> Selector:
+        """Returns the parsed document, reusing a cached one for identical HTML."""
+        key = content_hash(html)
+        with self._lock:
+            if cached := self._docs.get(key):
+                self._docs.move_to_end(key)
+                _stats.count("parse.cache_hits")
+                return cached[0]
+
+        with _stats.span("parse", bytes=len(html)):
+            doc = Selector(text=html)
+        size = len(html) * _PARSED_SIZE_FACTOR
+        if size > self.max_bytes:
+            return doc
+
+        with self._lock:
+            if key not in self._docs:
+                self._docs[key] = (doc, size)
+                self._size += size
+                self._evict()
+
+        return doc
+
+    def get(self, key: bytes) -> Selector | None:
+        """The cached document with the content hash, if it wasn't evicted."""
+        with self._lock:
+            if cached := self._docs.get(key):
+                self._docs.move_to_end(key)
+                return cached[0]
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._docs.clear()
+            self._size = 0
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._docs:
+            _, (_, size) = self._docs.popitem(last=False)
+            self._size -= size
+
+
+def content_hash(html: str) -> bytes:
+    return hashlib.blake2b(
+        html.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+
+
+documents = DocumentCache(
+    max_bytes=int(os.environ.get("GENXPATH_DOC_CACHE_MB", "512")) * 1024 * 1024
+)
+
+
+def parse_html(html: str) -> Selector:
+    """Parses the HTML document through the shared `documents` cache."""
+    return documents.parse(html)
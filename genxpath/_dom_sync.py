@@ -0,0 +1,99 @@
+"""Keeps a parsed document in sync with the DOM of a live page in the browser.
+
+The browser sends batches of changes, see `_browser._JS_OBSERVE`, each addressed by
+the path of element child indices from the root element, as of after the whole
+batch. Changes come in document order, so applying them one by one keeps every
+later path valid.
+"""
+
+import typing as t
+
+import lxml.etree as etree
+import lxml.html
+from parsel import Selector
+
+from genxpath._index import invalidate_index
+from genxpath._query import forget_queries
+
+
+class DomChange(t.TypedDict):
+    # attrs - replace the attributes of the element
+    # insert - insert `html` as the `index`-th child element
+    # children - replace the content of the element with `html`
+    op: t.Literal["attrs", "insert", "children"]
+    path: list[int]
+    attrs: t.NotRequired[dict[str, str]]
+    index: t.NotRequired[int]
+    html: t.NotRequired[str]
+
+
+class DomSyncError(Exception):
+    """The parsed document doesn't match the DOM in the browser anymore."""
+
+
+def apply_dom_changes(doc: Selector, changes: list[DomChange]) -> None:
+    """Applies the changes to the document in place.
+
+    Don't use it on documents from `_docs.documents`, they're shared. Raises
+    `DomSyncError` if the document has to be loaded from scratch instead.
+    """
+    root = doc.root.getroottree().getroot()
+    try:
+        for change in changes:
+            el = _element_at(root, change["path"])
+            match change["op"]:
+                case "attrs":
+                    el.attrib.clear()
+                    el.attrib.update(change.get("attrs", {}))
+                case "insert":
+                    _insert(el, change.get("index", 0), change.get("html", ""))
+                case "children":
+                    _replace_children(el, change.get("html", ""))
+    finally:
+        invalidate_index(doc)
+        forget_queries(doc)
+
+
+def _element_at(root: etree._Element, path: list[int]) -> etree._Element:
+    el = root
+    for i in path:
+        children = _child_elements(el)
+        if i >= len(children):
+            raise DomSyncError(f"No element at {path}")
+        el = children[i]
+    return el
+
+
+def _child_elements(el: etree._Element) -> list[etree._Element]:
+    # Comments are children in lxml, but not in DOM's `children`.
+    return [child for child in el if isinstance(child.tag, str)]
+
+
+def _insert(parent: etree._Element, index: int, html: str) -> None:
+    try:
+        new_el = lxml.html.fragment_fromstring(html)
+    except etree.ParserError as e:
+        raise DomSyncError(f"Can't parse inserted element: {e}") from e
+
+    children = _child_elements(parent)
+    if index > len(children):
+        raise DomSyncError(f"No position {index} in {parent.tag}")
+    if index == len(children):
+        parent.append(new_el)
+    else:
+        children[index].addprevious(new_el)
+
+
+def _replace_children(el: etree._Element, html: str) -> None:
+    try:
+        fragments = lxml.html.fragments_fromstring(html) if html.strip() else []
+    except etree.ParserError as e:
+        raise DomSyncError(f"Can't parse element content: {e}") from e
+
+    for child in list(el):
+        el.remove(child)
+
+    el.text = None
+    if fragments and isinstance(fragments[0], str):
+        el.text = fragments.pop(0)
+    el.extend(fragments)
@@ -0,0 +1,159 @@
+"""Bulk extraction of model fields with the XPaths `find_xpaths()` generated.
+
+Once XPaths are found on a few sample pages, they're applied to many more pages
+of the same kind. An `Extractor` compiles them only once and parses every page
+only once, however many fields there are, and `extract_many()` runs it in a
+process pool, streaming records in input order with bounded memory.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import itertools
+import os
+from pathlib import Path
+import typing as t
+
+import lxml.etree as etree
+import lxml.html
+
+from genxpath import _stats
+from genxpath._index import normalize_space
+
+# Pages sent to a worker at once.
+EXTRACT_CHUNK_SIZE = 16
+# Worker processes are replaced after this many chunks, so memory fragmented by
+# parsing stays bounded over long runs.
+MAX_CHUNKS_PER_WORKER = 500
+# Chunks submitted ahead per worker, more aren't read from the input meanwhile.
+_CHUNKS_IN_FLIGHT_PER_WORKER = 4
+
+# Field name -> extracted value, None if no XPath of the field matched.
+Record = dict[str, str | None]
+
+
+class Extractor:
+    """Not thread-safe, the HTML parser is reused for every page."""
+
+    def __init__(self, field_xpaths: t.Mapping[str, t.Sequence[str]]):
+        """
+        Args:
+            field_xpaths: XPaths per field, as returned by `find_xpaths()`. The
+                first one that matches on a page is used.
+        """
+        self._compiled = {
+            field: [_compile(xpath) for xpath in xpaths]
+            for field, xpaths in field_xpaths.items()
+        }
+        # Same as parsel's, so XPaths see the same tree they were generated on.
+        self._parser = lxml.html.HTMLParser(
+            recover=True, encoding="utf-8", huge_tree=True
+        )
+
+    def extract(self, html_doc: str) -> Record:
+        """Values of all fields in the page."""
+        root = self._parse(html_doc)
+        return {
+            field: _first_value(root, xpaths)
+            for field, xpaths in self._compiled.items()
+        }
+
+    def _parse(self, html_doc: str) -> etree._Element:
+        # Like `Selector(text=...)`, but not through the shared document cache,
+        # pages are seen only once, and without creating a parser every time.
+        body = html_doc.strip().replace("\x00", "").encode("utf-8") or b"<html/>"
+        root = etree.fromstring(body, parser=self._parser)
+        if root is None:
+            root = etree.fromstring(b"<html/>", parser=self._parser)
+        return root
+
+
+def extract_many(
+    field_xpaths: t.Mapping[str, t.Sequence[str]],
+    pages: t.Iterable[str | Path],
+    workers: int | None = None,
+    chunksize: int = EXTRACT_CHUNK_SIZE,
+    max_chunks_per_worker: int = MAX_CHUNKS_PER_WORKER,
+) -> t.Iterator[Record | Exception]:
+    """Extracts fields from every page in a process pool.
+
+    A page is either the HTML itself or a `Path` to it, in which case it's read
+    by the worker. Records are yielded in input order as soon as they're ready,
+    and pages are read from `pages` only as fast as records are consumed. A page
+    that failed is yielded as the exception instead of failing the whole run.
+    """
+    # Invalid XPaths fail here rather than in every worker.
+    Extractor(field_xpaths)
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunked(pages, chunksize)
+    in_flight = deque[Future[list[Record | Exception]]]()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=({field: list(xpaths) for field, xpaths in field_xpaths.items()},),
+        max_tasks_per_child=max_chunks_per_worker,
+    ) as pool:
+        for chunk in itertools.islice(chunks, workers * _CHUNKS_IN_FLIGHT_PER_WORKER):
+            in_flight.append(pool.submit(_extract_chunk, chunk))
+
+        while in_flight:
+            records = in_flight.popleft().result()
+            if (chunk := next(chunks, None)) is not None:
+                in_flight.append(pool.submit(_extract_chunk, chunk))
+            yield from records
+
+
+def _compile(xpath: str) -> etree.XPath:
+    try:
+        return etree.XPath(xpath, smart_strings=False)
+    except etree.XPathError as e:
+        raise ValueError(f"XPath error: {e} in {xpath}") from e
+
+
+def _first_value(root: etree._Element, xpaths: list[etree.XPath]) -> str | None:
+    for xpath in xpaths:
+        with _stats.span("xpath", expr=xpath.path):
+            found = xpath(root)
+        if isinstance(found, list):
+            if not found:
+                continue
+            found = found[0]
+
+        if isinstance(found, etree._Element):
+            return normalize_space("".join(found.itertext()))
+        if isinstance(found, bool):
+            return "1" if found else "0"
+        return normalize_space(str(found))
+
+    return None
+
+
+def _chunked(
+    pages: t.Iterable[str | Path], chunksize: int
+) -> t.Iterator[list[str | Path]]:
+    pages = iter(pages)
+    while chunk := list(itertools.islice(pages, chunksize)):
+        yield chunk
+
+
+# Built once per worker process, compiled XPaths can't be sent to it.
+_worker_extractor: Extractor | None = None
+
+
+def _init_worker(field_xpaths: dict[str, list[str]]) -> None:
+    global _worker_extractor
+    _worker_extractor = Extractor(field_xpaths)
+
+
+def _extract_chunk(pages: list[str | Path]) -> list[Record | Exception]:
+    assert _worker_extractor is not None
+
+    records = list[Record | Exception]()
+    for page in pages:
+        try:
+            html_doc = page.read_text() if isinstance(page, Path) else page
+            records.append(_worker_extractor.extract(html_doc))
+        except Exception as e:
+            records.append(e)
+    return records
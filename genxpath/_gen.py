@@ -1,46 +1,125 @@
-from parsel import Selector, SelectorList
+import lxml.etree as etree
+from parsel import Selector
 from dataclasses import dataclass
+from functools import lru_cache, partial
+import os
+from pathlib import Path
+import typing as t
 
+from genxpath import _stats
+from genxpath._docs import parse_html
+from genxpath._index import ANCHOR_ATTRS, anchor_xpath, doc_index, xpath_literal
+from genxpath._ngrams import ngram_index
 
-def find_xpaths(model: dict[str, str], html_doc: str) -> dict[str, list[str]]:
+# How a sample value is matched against texts and attributes:
+# exact - the whole normalized value equals it,
+# contains - the value contains it,
+# fuzzy - the value contains it with a few typos, case-insensitive.
+Match = t.Literal["exact", "contains", "fuzzy"]
+# Which unique XPath is generated for an element:
+# short - the shortest one, anchored on the closest unique attribute,
+# fast - the one that's fastest to evaluate, see `_xpath_candidates()`.
+Prefer = t.Literal["short", "fast"]
+
+
+def find_xpaths(
+    model: dict[str, str],
+    html_doc: Selector | str,
+    match: Match = "exact",
+    prefer: Prefer = "short",
+) -> dict[str, list[str]]:
     """For all model fields finds all possible XPaths to the value."""
     field_xpaths: dict[str, list[str]] = {}
 
-    doc = Selector(text=html_doc)
+    doc = parse_html(html_doc) if isinstance(html_doc, str) else html_doc
+    if match == "exact":
+        # Look up all sample values in one scan of the document.
+        doc_index(doc).find_values(v for v in model.values() if v)
     for field, sample_value in model.items():
         if sample_value:
-            field_xpaths[field] = find_xpaths_for(sample_value, doc)
+            field_xpaths[field] = find_xpaths_for(sample_value, doc, match, prefer)
         else:
             field_xpaths[field] = []
 
     return field_xpaths
 
 
-def find_xpaths_for(value: str, doc: Selector) -> list[str]:
-    """Value may be in a text node or an attribute - find an xpath to it."""
-    xpaths: list[str] = []
+def find_xpaths_batch(
+    jobs: t.Sequence[tuple[dict[str, str], str | Path]],
+    workers: int | None = None,
+    chunksize: int | None = None,
+    prefer: Prefer = "short",
+) -> t.Iterator[dict[str, list[str]]]:
+    """Runs `find_xpaths` for many (model, document) pairs in a process pool.
+
+    A document is either the HTML itself or a `Path` to it, in which case it's read
+    by the worker. Results are yielded in input order as soon as they're ready.
+    """
+    # Loads multiprocessing, which isn't needed to generate XPaths otherwise.
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # Few large chunks keep IPC overhead low, a few per worker balance the load.
+        chunksize = max(1, len(jobs) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(
+            partial(_find_xpaths_job, prefer=prefer), jobs, chunksize=chunksize
+        )
+
+
+def _find_xpaths_job(
+    job: tuple[dict[str, str], str | Path], prefer: Prefer = "short"
+) -> dict[str, list[str]]:
+    model, html_doc = job
+    if isinstance(html_doc, Path):
+        html_doc = html_doc.read_text()
+    # Batch pages aren't looked at again, the shared `documents` cache would only
+    # keep every worker's last few hundred MB of them alive.
+    with _stats.span("parse", bytes=len(html_doc)):
+        doc = Selector(text=html_doc)
+    return find_xpaths(model, doc, prefer=prefer)
+
 
+def find_xpaths_for(
+    value: str, doc: Selector, match: Match = "exact", prefer: Prefer = "short"
+) -> list[str]:
+    """Value may be in a text node or an attribute - find an xpath to it.
+
+    With a `match` other than "exact", the XPaths select the whole text node or
+    attribute the value was found in.
+    """
+    with _stats.span("find_xpaths_for"):
+        return list(iter_xpaths_for(value, doc, match, prefer))
+
+
+def iter_xpaths_for(
+    value: str, doc: Selector, match: Match = "exact", prefer: Prefer = "short"
+) -> t.Iterator[str]:
+    """Same as `find_xpaths_for`, but yields every XPath as soon as it's generated."""
     # 1. Find elements that contain value we're looking for.
-    selectors = _find_element_with_value(doc, value)
+    selectors = _find_element_with_value(doc, value, match)
     for sel in selectors:
-        # 2. Generate shortest unique XPath for the element.
-        xpath = _shortest_unique_xpath(doc, sel.in_elem)
+        # 2. Generate shortest (or fastest) unique XPath for the element.
+        if prefer == "fast":
+            xpath = _fastest_unique_xpath(doc, sel.in_elem)
+        else:
+            xpath = _shortest_unique_xpath(doc, sel.in_elem)
         if sel.in_attr:
-            xpath = f"{xpath}/@{sel.in_attr}"
+            yield f"{xpath}/@{sel.in_attr}"
+        elif sel.text_node and _text_node_count(sel.in_elem) > 1:
+            yield f"{xpath}/text()[{sel.text_node}]"
         else:
-            xpath = f"{xpath}/text()"
-
-        xpaths.append(xpath)
+            yield f"{xpath}/text()"
 
     # 3. Optionally could infer operations required to extract the exact value.
 
-    return xpaths
-
 
 def minimize_xpath(doc: Selector | str, xpath: str) -> str:
     """Try to minimize the XPath for a given element."""
     if isinstance(doc, str):
-        doc = Selector(text=doc)
+        doc = parse_html(doc)
 
     if xpath.endswith("/text()"):
         xpath = xpath[: -len("/text()")]
@@ -48,7 +127,16 @@ def minimize_xpath(doc: Selector | str, xpath: str) -> str:
     else:
         text_nodes = False
 
-    if not (element := next(iter(doc.xpath(xpath)), None)):
+    try:
+        compiled = _compile_xpath(xpath, tuple(sorted(doc.namespaces.items())))
+        with _stats.span("xpath", expr=xpath):
+            found = compiled(doc.root)
+    except etree.XPathError as e:
+        raise ValueError(f"XPath error: {e} in {xpath}") from e
+
+    if not isinstance(found, list) or not found:
+        return xpath
+    if not isinstance(element := found[0], etree._Element):
         return xpath
 
     shorter_xpath = _shortest_unique_xpath(doc, element)
@@ -57,60 +145,155 @@ def minimize_xpath(doc: Selector | str, xpath: str) -> str:
     return shorter_xpath
 
 
+@lru_cache(maxsize=1024)
+def _compile_xpath(
+    xpath: str, namespaces: tuple[tuple[str, str], ...] = ()
+) -> etree.XPath:
+    return etree.XPath(xpath, namespaces=dict(namespaces))
+
+
 @dataclass
 class _ValueSelector:
     value: str
-    in_elem: Selector
+    in_elem: etree._Element
     in_attr: str | None = None
+    # Position of the text node with a partial value, the element's text can be
+    # split into many by child elements.
+    text_node: int | None = None
+
 
+def _find_element_with_value(
+    doc: Selector, value: str, match: Match = "exact"
+) -> list[_ValueSelector]:
+    if match != "exact":
+        ngrams = ngram_index(doc)
+        found = ngrams.contains(value) if match == "contains" else ngrams.similar(value)
+        return [
+            _ValueSelector(value=value, in_elem=el, in_attr=where)
+            if isinstance(where, str)
+            else _ValueSelector(value=value, in_elem=el, text_node=where)
+            for el, where in found
+        ]
 
-def _find_element_with_value(doc: Selector, value: str) -> list[_ValueSelector]:
-    # Find element with value in text.
-    selectors = doc.xpath(f'//*[normalize-space(text())="{value}"]')
-    # Find element with value in an attribute.
-    attr_selectors = doc.xpath(f'//*[@*[normalize-space()="{value}"]]')
-    return [_ValueSelector(value=value, in_elem=sel) for sel in selectors] + [
-        _ValueSelector(value=value, in_elem=sel, in_attr=attr)
-        for sel in attr_selectors
-        for attr, attr_value in sel.attrib.items()
-        if attr_value == value
+    index = doc_index(doc)
+    # Elements with value in text, then elements with value in an attribute.
+    return [
+        _ValueSelector(value=value, in_elem=el)
+        for el in index.elements_with_text(value)
+    ] + [
+        _ValueSelector(value=value, in_elem=el, in_attr=attr)
+        for el, attr in index.attrs_with_value(value)
     ]
 
 
-def _shortest_unique_xpath(doc: Selector, element: Selector) -> str:
+def _text_node_count(el: etree._Element) -> int:
+    return bool(el.text) + sum(1 for child in el if child.tail)
+
+
+def _shortest_unique_xpath(doc: Selector, element: etree._Element) -> str:
     """
     Try to generate the shortest unique XPath for a given element.
     """
-    if short_xpath := _xpath_by_attr(doc, element):
-        return short_xpath
+    index = doc_index(doc)
+    attr_count = index.attr_count
+    if stats := _stats.active():
+        attr_count = stats.counted("anchor_candidates", attr_count)
 
-    full_path: str = element.root.getroottree().getpath(element.root)
+    full_path: str = element.getroottree().getpath(element)
+    # One step per ancestor, e.g. ['', 'html', 'body', 'div[2]', 'span'].
+    steps = full_path.split("/")
 
-    # Try to minimize the full_path by going from children to parents.
-    suffix_nodes = list[str]()
-    nodes = full_path.split("/")
-    while nodes:
-        suffix_nodes.insert(0, nodes.pop())
+    # Walk up from the element itself to the root, looking for a unique anchor.
+    suffix_start = len(steps)
+    node: etree._Element | None = element
+    while node is not None:
+        if short_xpath := anchor_xpath(node.attrib, attr_count):
+            _stats.count("ancestor_steps", len(steps) - suffix_start)
+            return "/".join([short_xpath, *steps[suffix_start:]])
 
-        prefix_xpath = "/".join(nodes)
-        prev_elem = doc.xpath(prefix_xpath)
-        if short_xpath := _xpath_by_attr(doc, prev_elem):
-            return f"{short_xpath}/{'/'.join(suffix_nodes)}"
+        suffix_start -= 1
+        node = node.getparent()
 
     # Fallback to full absolute path
+    _stats.count("ancestor_steps", len(steps) - 1)
     return full_path
 
 
-def _xpath_by_attr(doc: Selector, element: Selector | SelectorList) -> str | None:
-    # 1. Prefer unique ID
-    el_id = element.attrib.get("id")
-    if el_id and len(doc.xpath(f"//*[@id='{el_id}']")) == 1:
-        return f"//*[@id='{el_id}']"
+@dataclass
+class _Candidate:
+    xpath: str
+    # Estimated nodes libxml2 visits to evaluate the XPath.
+    cost: int
+
+
+def _fastest_unique_xpath(doc: Selector, element: etree._Element) -> str:
+    """The unique XPath for the element that's fastest to evaluate."""
+    for candidate in _xpath_candidates(doc, element):
+        # id() relies on libxml2's ID table rather than on attribute counts, check
+        # it still finds the element, e.g. after the document was modified in place.
+        if not candidate.xpath.startswith("id(") or _selects_only(
+            doc, candidate.xpath, element
+        ):
+            return candidate.xpath
+    return _shortest_unique_xpath(doc, element)
+
+
+def _xpath_candidates(doc: Selector, element: etree._Element) -> list[_Candidate]:
+    """Unique XPaths for the element, fastest first.
+
+    Like `_shortest_unique_xpath()`, every XPath is anchored on a unique attribute
+    of the element or an ancestor, as those survive changes elsewhere on similar
+    pages, or it's the absolute path if there are none. `//*[@attr='value']`
+    scans the whole document to find the anchor though, while `id('value')` looks
+    it up without scanning, so an id further up with a longer path below it is
+    usually much faster.
+
+    Costs are estimated as the number of nodes visited: every node for a scan and
+    all children of every element a child step starts from. Equally fast XPaths
+    keep the order `_shortest_unique_xpath()` prefers: closest anchor first.
+    """
+    index = doc_index(doc)
+    attr_count = index.attr_count
+    scan_cost = index.node_count()
+
+    full_path: str = element.getroottree().getpath(element)
+    steps = full_path.split("/")
+
+    candidates = list[_Candidate]()
+    suffix_cost = 0
+    node: etree._Element | None = element
+    suffix_start = len(steps)
+    while node is not None:
+        for attr in ANCHOR_ATTRS:
+            val = node.get(attr)
+            if not val or attr_count(attr, val) != 1:
+                continue
+            literal = xpath_literal(val)
+            anchors = [(f"//*[@{attr}={literal}]", scan_cost)]
+            if attr == "id":
+                anchors.insert(0, (f"id({literal})", 1))
+            for anchor, cost in anchors:
+                xpath = "/".join([anchor, *steps[suffix_start:]])
+                candidates.append(_Candidate(xpath, cost + suffix_cost))
+
+        if (parent := node.getparent()) is not None:
+            # A child step visits all children of the element it starts from.
+            suffix_cost += len(parent)
+        suffix_start -= 1
+        node = parent
+
+    if not candidates:
+        # The first step of the absolute path visits only the root.
+        candidates.append(_Candidate(full_path, suffix_cost + 1))
+
+    _stats.count("xpath_candidates", len(candidates))
+    candidates.sort(key=lambda c: c.cost)
+    return candidates
 
-    # 2. Prefer unique attributes
-    for attr in ["data-testid", "data-id", "name", "class", "itemprop"]:
-        val = element.attrib.get(attr)
-        if val and len(doc.xpath(f"//*[@{attr}='{val}']")) == 1:
-            return f"//*[@{attr}='{val}']"
 
-    return None
+def _selects_only(doc: Selector, xpath: str, element: etree._Element) -> bool:
+    try:
+        found = _compile_xpath(xpath, tuple(sorted(doc.namespaces.items())))(doc.root)
+    except etree.XPathError:
+        return False
+    return isinstance(found, list) and len(found) == 1 and found[0] is element
@@ -0,0 +1,181 @@
+"""Per-document lookup tables for XPath generation.
+
+Built lazily from bulk XPath queries, which libxml2 answers much faster than a
+Python loop over every element, and kept for as long as the document lives, so
+repeated value searches and uniqueness checks don't scan the document again.
+"""
+
+from collections import Counter
+import re
+import typing as t
+import weakref
+from weakref import WeakKeyDictionary
+
+import lxml.etree as etree
+from parsel import Selector
+
+from genxpath import _stats
+
+# Attributes we try to anchor XPaths on, in order of preference.
+ANCHOR_ATTRS = ("id", "data-testid", "data-id", "name", "class", "itemprop")
+
+# XPath's normalize-space() only treats these as whitespace, unlike str.split().
+_XML_SPACE = re.compile(r"[ \t\r\n]+")
+# Whitespace that normalize-space() would change after stripping the ends.
+_UNNORMALIZED_SPACE = re.compile(r"[\t\r\n]|  ")
+
+# First text node of every element, i.e. what text() picks in a string context.
+_FIRST_TEXTS = etree.XPath("//*/text()[1]")
+_ALL_ATTR_VALUES = etree.XPath("//@*", smart_strings=False)
+_ELEMENTS_WITH_ATTR_VALUE = etree.XPath("//*[@*=$value]")
+_NODE_COUNT = etree.XPath("count(//node())")
+
+
+class DocIndex:
+    def __init__(self, root: etree._Element):
+        # The index lives only as long as the document, it mustn't keep it alive.
+        self._root_ref = weakref.ref(root)
+        self._attr_counts = dict[str, Counter[str]]()
+        self._text_values = dict[str, list[etree._Element]]()
+        self._attr_values = dict[str, list[tuple[etree._Element, str]]]()
+        self._node_count: int | None = None
+
+    @property
+    def _root(self) -> etree._Element:
+        if (root := self._root_ref()) is None:
+            raise ReferenceError("The indexed document was freed")
+        return root
+
+    def attr_count(self, attr: str, value: str) -> int:
+        """Number of elements in the document where `@attr = value`."""
+        if (counts := self._attr_counts.get(attr)) is None:
+            xpath = f"//@{attr}"
+            with _stats.span("xpath", expr=xpath):
+                attr_values = etree.XPath(xpath, smart_strings=False)(self._root)
+            counts = self._attr_counts[attr] = Counter(attr_values)
+        return counts[value]
+
+    def node_count(self) -> int:
+        """Number of nodes in the document, including texts, i.e. what `//` visits."""
+        if self._node_count is None:
+            self._node_count = int(_NODE_COUNT(self._root))
+        return self._node_count
+
+    def elements_with_text(self, value: str) -> list[etree._Element]:
+        """Elements matching `normalize-space(text()) = value`, in document order."""
+        self.find_values([value])
+        return self._text_values[value]
+
+    def attrs_with_value(self, value: str) -> list[tuple[etree._Element, str]]:
+        """(element, attribute) pairs whose attribute value equals `value`."""
+        self.find_values([value])
+        return self._attr_values[value]
+
+    def find_values(self, values: t.Iterable[str]) -> None:
+        """Looks up all values in a single scan of the document.
+
+        Later `elements_with_text()` and `attrs_with_value()` calls for these
+        values are answered from memory.
+        """
+        if missing := {v for v in values if v not in self._text_values}:
+            with _stats.span("find_values", values=len(missing)):
+                self._find_texts(missing)
+                self._find_attrs(missing)
+
+    def _find_texts(self, values: set[str]) -> None:
+        found = {value: list[etree._Element]() for value in values}
+        from_tail = False
+        with _stats.span("xpath", expr=_FIRST_TEXTS.path):
+            texts = _FIRST_TEXTS(self._root)
+        for text in texts:
+            key = text.strip(" \t\r\n")
+            if _UNNORMALIZED_SPACE.search(key):
+                key = normalize_space(key)
+            if key not in found:
+                continue
+
+            el = text.getparent()
+            if text.is_tail:
+                # The text follows a child element, e.g. <p><br/>value</p>.
+                el = el.getparent()
+                from_tail = True
+            found[key].append(el)
+
+        for value, elements in found.items():
+            if from_tail and len(elements) > 1:
+                # A tail can come after text nodes of later elements.
+                elements.sort(key=_document_position)
+            self._text_values[value] = elements
+
+    def _find_attrs(self, values: set[str]) -> None:
+        with _stats.span("xpath", expr=_ALL_ATTR_VALUES.path):
+            present = values.intersection(_ALL_ATTR_VALUES(self._root))
+        for value in values:
+            # Only values that survive normalize-space() unchanged can be matched
+            # exactly.
+            if value not in present or value != normalize_space(value):
+                self._attr_values[value] = []
+                continue
+
+            with _stats.span("xpath", expr=_ELEMENTS_WITH_ATTR_VALUE.path):
+                elements = _ELEMENTS_WITH_ATTR_VALUE(self._root, value=value)
+            self._attr_values[value] = [
+                (el, str(attr))
+                for el in elements
+                for attr, val in el.items()
+                if val == value
+            ]
+
+
+def anchor_xpath(
+    attrib: t.Mapping[str, str], attr_count: t.Callable[[str, str], int]
+) -> str | None:
+    """XPath selecting an element by its most preferred unique anchor attribute."""
+    for attr in ANCHOR_ATTRS:
+        val = attrib.get(attr)
+        if val and attr_count(attr, val) == 1:
+            return f"//*[@{attr}={xpath_literal(val)}]"
+
+    return None
+
+
+def xpath_literal(value: str) -> str:
+    """The value as an XPath string literal, XPath 1.0 has no escapes in them."""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat('" + "', \"'\", '".join(value.split("'")) + "')"
+
+
+def normalize_space(text: str) -> str:
+    """Same as XPath's normalize-space()."""
+    return _XML_SPACE.sub(" ", text).strip(" ")
+
+
+def _document_position(el: etree._Element) -> list[int]:
+    position = list[int]()
+    while (parent := el.getparent()) is not None:
+        position.append(parent.index(el))
+        el = parent
+    return position[::-1]
+
+
+# Keyed by the selector rather than the root element: indexes hold elements of the
+# document, possibly the root, which would then never be freed.
+_indexes = WeakKeyDictionary[Selector, DocIndex]()
+
+
+def doc_index(doc: Selector) -> DocIndex:
+    """Returns the index of the document, building it if needed.
+
+    It's kept for as long as `doc` is.
+    """
+    if (index := _indexes.get(doc)) is None:
+        index = _indexes[doc] = DocIndex(doc.root.getroottree().getroot())
+    return index
+
+
+def invalidate_index(doc: Selector) -> None:
+    """Drops the index of a document that was modified in place."""
+    _indexes.pop(doc, None)
@@ -1,19 +1,226 @@
-from rnet.blocking import Client as RnetClient
-from rnet.emulation import EmulationOption
+import asyncio
+from collections import defaultdict
+from functools import lru_cache
 import logging
-from cache3 import DiskCache
+import time
+import typing as t
+from urllib.parse import urlsplit
+import zlib
 
+from genxpath._docs import content_hash
 
-def http_get(url: str, cache: DiskCache) -> str:
-    if cached := cache.get(url):
+if t.TYPE_CHECKING:
+    from cache3 import DiskCache
+    from rnet import Client as AsyncRnetClient
+    from rnet.blocking import Client as RnetClient
+
+# Pages are served from the cache without asking the server for this long.
+_FRESH_FOR_SECONDS = 24 * 3600
+# Stale pages are kept longer, so they can be revalidated with a 304 instead of
+# downloading the whole body again.
+_KEEP_FOR_SECONDS = 30 * 24 * 3600
+
+# Default limit of concurrent requests to the same host in `fetch_many`.
+MAX_REQUESTS_PER_HOST = 4
+
+
+class FetchError(Exception):
+    """Server didn't return the page."""
+
+
+class _CachedPage(t.TypedDict):
+    """Stored under the URL. The body is stored once per distinct content, see
+    `_body_key()`, because many URLs serve identical pages.
+    """
+
+    digest: str
+    fetched_at: float
+    etag: str | None
+    last_modified: str | None
+    # Rendered by a browser, see `store_html()`. Missing in older entries.
+    rendered: t.NotRequired[bool]
+
+
+def http_get(url: str, cache: "DiskCache") -> str:
+    page = _cached_page(cache, url)
+    if page and _is_usable(page) and (html_doc := _load_body(cache, page)):
         logging.info(f"Cache hit for {url}")
-        return cached
+        return html_doc
+
+    resp = _client().get(url, headers=_validators(page))
+    status = resp.status.as_int()
+    if page and status == 304:
+        return _revalidated(cache, url, page)
 
-    http_client = RnetClient(emulation=EmulationOption.random(), allow_redirects=True)
-    resp = http_client.get(url)
+    _check_status(url, status)
     html_doc = resp.text()
-    cache.set(url, html_doc, timeout=24 * 3600)
-    logging.info(f"Cached {url}")
+    _store(cache, url, html_doc, resp.headers)
+    return html_doc
+
+
+async def fetch(url: str, cache: "DiskCache") -> str:
+    """Same as `http_get`, but doesn't block and reuses pooled connections."""
+    page = _cached_page(cache, url)
+    if page and _is_usable(page) and (html_doc := _load_body(cache, page)):
+        logging.info(f"Cache hit for {url}")
+        return html_doc
 
-    assert resp.status.as_int() == 200
+    resp = await _async_client().get(url, headers=_validators(page))
+    status = resp.status.as_int()
+    if page and status == 304:
+        return _revalidated(cache, url, page)
+
+    _check_status(url, status)
+    html_doc = await resp.text()
+    _store(cache, url, html_doc, resp.headers)
     return html_doc
+
+
+def cached_html(url: str, cache: "DiskCache", rendered: bool = False) -> str | None:
+    """The page from the cache, if it's still fresh.
+
+    With `rendered`, only a page that was rendered by a browser.
+    """
+    page = _cached_page(cache, url)
+    if not page or not _is_fresh(page):
+        return None
+    if rendered and not page.get("rendered"):
+        return None
+    return _load_body(cache, page)
+
+
+def store_html(
+    url: str, cache: "DiskCache", html_doc: str, rendered: bool = False
+) -> None:
+    """Caches a page that wasn't fetched here, e.g. rendered by a browser.
+
+    `http_get()` and `fetch()` return it too, for as long as it's fresh. A
+    rendered page can't be fetched again, so they return it for as long as it's
+    kept instead, and only rendering it again replaces it.
+    """
+    _store(cache, url, html_doc, {}, rendered)
+
+
+async def fetch_many(
+    urls: t.Iterable[str],
+    cache: "DiskCache",
+    max_per_host: int = MAX_REQUESTS_PER_HOST,
+) -> list[str | BaseException]:
+    """Fetches all URLs concurrently, at most `max_per_host` at a time per host.
+
+    Results are in the same order as `urls`. A failed fetch is returned as the
+    exception instead of failing the whole batch.
+    """
+    host_limits = defaultdict[str, asyncio.Semaphore](
+        lambda: asyncio.Semaphore(max_per_host)
+    )
+
+    async def fetch_limited(url: str) -> str:
+        async with host_limits[urlsplit(url).netloc]:
+            return await fetch(url, cache)
+
+    return await asyncio.gather(
+        *(fetch_limited(url) for url in urls), return_exceptions=True
+    )
+
+
+@lru_cache(maxsize=1)
+def _client() -> "RnetClient":
+    # rnet is slow to import, so only once something is fetched.
+    from rnet.blocking import Client as RnetClient
+    from rnet.emulation import EmulationOption
+
+    return RnetClient(emulation=EmulationOption.random(), allow_redirects=True)
+
+
+@lru_cache(maxsize=1)
+def _async_client() -> "AsyncRnetClient":
+    from rnet import Client as AsyncRnetClient
+    from rnet.emulation import EmulationOption
+
+    return AsyncRnetClient(emulation=EmulationOption.random(), allow_redirects=True)
+
+
+def _cached_page(cache: "DiskCache", url: str) -> _CachedPage | None:
+    cached = cache.get(url)
+    if isinstance(cached, str):
+        # Stored as plain HTML by older versions, move it to the new layout.
+        return _store(cache, url, cached, {})
+    return cached
+
+
+def _is_fresh(page: _CachedPage) -> bool:
+    return time.time() - page["fetched_at"] < _FRESH_FOR_SECONDS
+
+
+def _is_usable(page: _CachedPage) -> bool:
+    """Whether `http_get()` and `fetch()` return the page without a request.
+
+    Fetching a rendered page would replace it with the HTML before rendering.
+    """
+    return _is_fresh(page) or page.get("rendered", False)
+
+
+def _validators(page: _CachedPage | None) -> dict[str, str]:
+    headers = {}
+    if page and page["etag"]:
+        headers["If-None-Match"] = page["etag"]
+    if page and page["last_modified"]:
+        headers["If-Modified-Since"] = page["last_modified"]
+    return headers
+
+
+def _revalidated(cache: "DiskCache", url: str, page: _CachedPage) -> str:
+    if (html_doc := _load_body(cache, page)) is None:
+        raise FetchError(f"GET {url}: server says not modified, but body is gone")
+
+    cache.set(url, {**page, "fetched_at": time.time()}, timeout=_KEEP_FOR_SECONDS)
+    cache.touch(_body_key(page["digest"]), timeout=_KEEP_FOR_SECONDS)
+    logging.info(f"Revalidated {url}")
+    return html_doc
+
+
+def _store(
+    cache: "DiskCache",
+    url: str,
+    html_doc: str,
+    headers: t.Any,
+    rendered: bool = False,
+) -> _CachedPage:
+    page: _CachedPage = {
+        "digest": content_hash(html_doc).hex(),
+        "fetched_at": time.time(),
+        "etag": _header(headers, "etag"),
+        "last_modified": _header(headers, "last-modified"),
+        "rendered": rendered,
+    }
+
+    body_key = _body_key(page["digest"])
+    if not cache.touch(body_key, timeout=_KEEP_FOR_SECONDS):
+        body = zlib.compress(html_doc.encode("utf-8", "surrogatepass"), level=9)
+        cache.set(body_key, body, timeout=_KEEP_FOR_SECONDS)
+    cache.set(url, page, timeout=_KEEP_FOR_SECONDS)
+    logging.info(f"Cached {url}")
+
+    return page
+
+
+def _load_body(cache: "DiskCache", page: _CachedPage) -> str | None:
+    if (body := cache.get(_body_key(page["digest"]))) is None:
+        return None
+    return zlib.decompress(body).decode("utf-8", "surrogatepass")
+
+
+def _body_key(digest: str) -> str:
+    return f"body:{digest}"
+
+
+def _header(headers: t.Any, name: str) -> str | None:
+    if (value := headers.get(name)) is None:
+        return None
+    return value.decode("latin-1") if isinstance(value, bytes) else str(value)
+
+
+def _check_status(url: str, status: int) -> None:
+    if status != 200:
+        raise FetchError(f"GET {url} failed with HTTP {status}")
@@ -0,0 +1,177 @@
+"""Trigram index for finding sample values inside longer texts and attributes.
+
+Samples are often only a part of the value, e.g. "199.99" in "Price: €199.99
+incl. VAT", or slightly different from it. Checking every value in the document
+for that is too slow on big pages, so values are looked up by their trigrams and
+only the few candidates sharing them are compared with the sample.
+"""
+
+from collections import Counter
+import itertools
+import typing as t
+from weakref import WeakKeyDictionary
+
+import lxml.etree as etree
+from parsel import Selector
+
+from genxpath import _stats
+from genxpath._index import DocIndex, doc_index, normalize_space
+
+# Text of these isn't shown on the page, so samples aren't looked for in it.
+_TEXTS = etree.XPath("//*[not(self::script or self::style)]/text()")
+_ATTRS = etree.XPath("//@*")
+
+# Approximate matches may differ from the sample by an edit per this many chars.
+_CHARS_PER_EDIT = 5
+
+# (element, attribute) pairs. Values in the element's text have the position of
+# their text node instead, as in `text()[2]`, text is split by child elements.
+ValueOwner = tuple[etree._Element, str | int]
+
+
+class NgramIndex:
+    def __init__(self, root: etree._Element):
+        # Distinct normalized values and where in the document each one is, as
+        # (position, lxml's "smart" string) pairs. Positions order texts before
+        # attributes, each in document order.
+        self._values = list[str]()
+        self._found_at = list[list[tuple[int, t.Any]]]()
+        # Trigram of lowercase values -> indices of values having it.
+        self._postings = dict[str, list[int]]()
+
+        with _stats.span("ngram_index"):
+            self._build(root)
+
+    def contains(self, sample: str) -> list[ValueOwner]:
+        """Where the sample is a part of the value, in document order."""
+        sample = normalize_space(sample)
+        if not sample:
+            return []
+        found = [i for i in self._candidates(sample) if sample in self._values[i]]
+        return self._owners(sorted(self._positions(found)))
+
+    def similar(self, sample: str) -> list[ValueOwner]:
+        """Where the value contains the sample with a few edits, ignoring case.
+
+        Up to one edit per `_CHARS_PER_EDIT` characters of the sample, closest
+        matches first.
+        """
+        sample = normalize_space(sample).lower()
+        grams = _trigrams(sample)
+        # A match with k edits shares at least len(grams) - 3k trigrams with the
+        # sample, allow as many edits as still leave at least one.
+        max_edits = min(len(sample) // _CHARS_PER_EDIT, (len(grams) - 1) // 3)
+        if max_edits <= 0:
+            found = [
+                i for i in self._candidates(sample) if sample in self._values[i].lower()
+            ]
+            return self._owners(sorted(self._positions(found)))
+
+        shared = Counter[int]()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        min_shared = len(grams) - 3 * max_edits
+
+        matches = list[tuple[int, int, t.Any]]()
+        for i, count in shared.items():
+            if count < min_shared:
+                continue
+            edits = _substring_distance(sample, self._values[i].lower(), max_edits)
+            if edits <= max_edits:
+                matches.extend((edits, pos, found) for pos, found in self._found_at[i])
+        matches.sort(key=lambda match: match[:2])
+        return self._owners((pos, found) for _, pos, found in matches)
+
+    def _build(self, root: etree._Element) -> None:
+        # Most values repeat, e.g. class names, so each is normalized only once.
+        value_ids = dict[str, int | None]()
+        found_values = itertools.chain(_TEXTS(root), _ATTRS(root))
+        for pos, found in enumerate(found_values):
+            if (i := value_ids.get(found, -1)) == -1:
+                i = value_ids[found] = self._add(str(found))
+            if i is not None:
+                self._found_at[i].append((pos, found))
+
+    def _add(self, raw_value: str) -> int | None:
+        if not (value := normalize_space(raw_value)):
+            return None
+
+        i = len(self._values)
+        self._values.append(value)
+        self._found_at.append([])
+        for gram in _trigrams(value.lower()):
+            self._postings.setdefault(gram, []).append(i)
+        return i
+
+    def _candidates(self, sample: str) -> t.Iterable[int]:
+        """Values that may contain the sample, a superset of the matching ones."""
+        grams = _trigrams(sample.lower())
+        if not grams:
+            # Too short for trigrams, only a full scan can tell.
+            return range(len(self._values))
+        # All values containing the sample have all of its trigrams, the rarest one
+        # leaves the fewest candidates to check.
+        return min((self._postings.get(gram, []) for gram in grams), key=len)
+
+    def _positions(self, value_ids: list[int]) -> t.Iterator[tuple[int, t.Any]]:
+        for i in value_ids:
+            yield from self._found_at[i]
+
+    def _owners(self, found_values: t.Iterable[tuple[int, t.Any]]) -> list[ValueOwner]:
+        return list(dict.fromkeys(_owner(found) for _, found in found_values))
+
+
+def _owner(found: t.Any) -> ValueOwner:
+    """Where lxml found a text or an attribute value."""
+    el = found.getparent()
+    if found.is_attribute:
+        return (el, found.attrname)
+    if not found.is_tail:
+        return (el, 1)
+
+    # The text follows a child element, e.g. <p>Now <b>only</b> value</p>.
+    parent = el.getparent()
+    position = 1 if parent.text else 0
+    for child in parent:
+        if child.tail:
+            position += 1
+        if child is el:
+            break
+    return (parent, position)
+
+
+def _trigrams(value: str) -> set[str]:
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+def _substring_distance(pattern: str, text: str, max_edits: int) -> int:
+    """Fewest edits turning the pattern into some substring of the text.
+
+    Anything over `max_edits` is reported as max_edits + 1.
+    """
+    # Edits for pattern[:i] to end at the current text position, starting anywhere.
+    row = list(range(len(pattern) + 1))
+    best = row[-1]
+    for char in text:
+        prev_diag, row[0] = row[0], 0
+        for i, pattern_char in enumerate(pattern, 1):
+            prev_diag, row[i] = (
+                row[i],
+                min(row[i] + 1, row[i - 1] + 1, prev_diag + (pattern_char != char)),
+            )
+        best = min(best, row[-1])
+        if best == 0:
+            break
+    return min(best, max_edits + 1)
+
+
+# Kept for as long as the document's `DocIndex`, so dropped together with it.
+_ngram_indexes = WeakKeyDictionary[DocIndex, NgramIndex]()
+
+
+def ngram_index(doc: Selector) -> NgramIndex:
+    """Returns the trigram index of the document, building it if needed."""
+    index = doc_index(doc)
+    if (ngrams := _ngram_indexes.get(index)) is None:
+        ngrams = _ngram_indexes[index] = NgramIndex(doc.root.getroottree().getroot())
+    return ngrams
@@ -0,0 +1,131 @@
+"""XPath queries for interactive use, memoized per document.
+
+While an XPath is being edited, the same expressions come back again and again,
+so the last `MAX_MEMO_QUERIES` results of every document are kept. They're the
+raw lxml results, which cost nothing to keep compared to a parsel selector for
+every match.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock, Timer
+import typing as t
+from weakref import WeakKeyDictionary
+
+import lxml.etree as etree
+from parsel import Selector
+
+from genxpath import _stats
+
+# Expressions remembered per document.
+MAX_MEMO_QUERIES = 32
+# Typing pauses this long before a live query runs.
+QUERY_DELAY_SECONDS = 0.2
+
+# Results can include the root element, so they're keyed by the selector.
+_memos = WeakKeyDictionary[Selector, OrderedDict[str, list[t.Any]]]()
+_memos_lock = Lock()
+
+
+def query_xpath(doc: Selector, xpath: str) -> list[t.Any]:
+    """Elements, strings or a single number the XPath selects in the document.
+
+    Answered from memory if the XPath already ran on the document. Raises
+    `ValueError` if the XPath is invalid, like `Selector.xpath()`.
+    """
+    if (found := memoized_query(doc, xpath)) is not None:
+        return found
+
+    try:
+        compiled = _compile_query(xpath, tuple(sorted(doc.namespaces.items())))
+        with _stats.span("xpath", expr=xpath):
+            found = compiled(doc.root)
+    except etree.XPathError as e:
+        raise ValueError(f"XPath error: {e} in {xpath}") from e
+    if not isinstance(found, list):
+        found = [found]
+
+    with _memos_lock:
+        memo = _memos.setdefault(doc, OrderedDict())
+        memo[xpath] = found
+        if len(memo) > MAX_MEMO_QUERIES:
+            memo.popitem(last=False)
+    return found
+
+
+def memoized_query(doc: Selector, xpath: str) -> list[t.Any] | None:
+    """Results of an XPath that already ran on the document, if still remembered."""
+    with _memos_lock:
+        if (memo := _memos.get(doc)) is None or xpath not in memo:
+            return None
+        memo.move_to_end(xpath)
+        _stats.count("query.memo_hits")
+        return memo[xpath]
+
+
+def forget_queries(doc: Selector) -> None:
+    """Drops the results remembered for a document that was modified in place."""
+    with _memos_lock:
+        _memos.pop(doc, None)
+
+
+class LiveQuery:
+    """Runs the XPath being typed in the background, once typing pauses.
+
+    Every `update()` supersedes the previous XPath: it's not run if it's still
+    waiting, and its results are dropped if it's already running, so a slow
+    XPath never holds back the latest one. `on_result` gets the XPath and its
+    results, or the `ValueError` if it's invalid, from a background thread.
+    """
+
+    def __init__(
+        self,
+        doc: Selector,
+        on_result: t.Callable[[str, list[t.Any] | ValueError], None],
+        delay: float = QUERY_DELAY_SECONDS,
+    ):
+        self.doc = doc
+        self.delay = delay
+        self._on_result = on_result
+
+        self._latest = ""
+        self._timer: Timer | None = None
+        self._lock = Lock()
+
+    def update(self, xpath: str) -> None:
+        with self._lock:
+            self._latest = xpath
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not xpath:
+                return
+            if memoized_query(self.doc, xpath) is None:
+                self._timer = Timer(self.delay, self._run, (xpath,))
+                self._timer.daemon = True
+                self._timer.start()
+                return
+
+        self._run(xpath)
+
+    def cancel(self) -> None:
+        self.update("")
+
+    def _run(self, xpath: str) -> None:
+        try:
+            result: list[t.Any] | ValueError = query_xpath(self.doc, xpath)
+        except ValueError as e:
+            result = e
+
+        with self._lock:
+            if xpath != self._latest:
+                return
+        self._on_result(xpath, result)
+
+
+@lru_cache(maxsize=1024)
+def _compile_query(
+    xpath: str, namespaces: tuple[tuple[str, str], ...] = ()
+) -> etree.XPath:
+    # Results are kept around, smart strings would keep their parents too.
+    return etree.XPath(xpath, namespaces=dict(namespaces), smart_strings=False)
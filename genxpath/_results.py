@@ -0,0 +1,93 @@
+"""Query results that are serialized only when shown.
+
+A query like `//div` can match tens of thousands of nodes, each with a big subtree.
+Serializing all of them before showing the first one is what makes such queries
+feel stuck, so `ResultSet` knows the count right away and serializes rows page by
+page, truncating long ones. Results are the raw lxml ones, wrapped in selectors
+only when asked for.
+"""
+
+from html import escape
+import typing as t
+
+import lxml.etree as etree
+from lxml.html.defs import empty_tags
+from parsel import Selector
+
+# Rows shown at once, more are loaded on request.
+PAGE_SIZE = 50
+# Longer serialized nodes are cut off.
+MAX_ROW_CHARS = 300
+
+# Their text isn't escaped in HTML.
+_RAW_TEXT_TAGS = {"script", "style"}
+
+
+class ResultSet:
+    def __init__(self, nodes: list[t.Any], max_chars: int = MAX_ROW_CHARS):
+        """
+        Args:
+            nodes: lxml XPath results, see `_query.query_xpath()`.
+        """
+        self.max_chars = max_chars
+        self._nodes = nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __getitem__(self, i: int) -> Selector:
+        return Selector(root=self._nodes[i], type="html")
+
+    def row(self, i: int) -> str:
+        """The i-th node serialized, truncated to `max_chars`."""
+        node = self._nodes[i]
+        if isinstance(node, etree._Element):
+            if (start := _html_start(node, self.max_chars)) is not None:
+                return start + "…"
+        return _truncate(self[i].get(), self.max_chars)
+
+    def page(self, start: int, size: int = PAGE_SIZE) -> list[tuple[int, str]]:
+        """(index, row) pairs of up to `size` results from `start`."""
+        return [(i, self.row(i)) for i in range(start, min(start + size, len(self)))]
+
+
+def _html_start(element: etree._Element, max_chars: int) -> str | None:
+    """First `max_chars` characters of the element's HTML, or None if it's shorter.
+
+    Stops walking the subtree once there's enough, unlike `etree.tostring()`.
+    """
+    parts = list[str]()
+    size = 0
+    for event, el in etree.iterwalk(element, events=("start", "end", "comment")):
+        if event == "comment":
+            part = f"<!--{el.text}-->" + escape(el.tail or "", quote=False)
+        elif event == "start":
+            attrs = "".join(_attr(k, v) for k, v in el.attrib.items())
+            text = el.text or ""
+            if el.tag not in _RAW_TEXT_TAGS:
+                text = escape(text, quote=False)
+            part = f"<{el.tag}{attrs}>{text}"
+        else:
+            part = "" if el.tag in empty_tags else f"</{el.tag}>"
+            if el is not element:
+                part += escape(el.tail or "", quote=False)
+
+        parts.append(part)
+        size += len(part)
+        if size > max_chars:
+            return "".join(parts)[:max_chars]
+
+    return None
+
+
+def _attr(name: str, value: str) -> str:
+    value = escape(value, quote=False)
+    # Same quoting as lxml.
+    if '"' in value and "'" not in value:
+        return f" {name}='{value}'"
+    value = value.replace('"', "&quot;")
+    return f' {name}="{value}"'
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars] + "…"
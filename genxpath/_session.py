@@ -0,0 +1,98 @@
+"""Named documents of an interactive shell session.
+
+Only where every document came from is kept. Parsed trees are in the shared
+`documents` cache, under its memory budget, and documents evicted from it are
+parsed again from the page cache or the file when they're used.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+import typing as t
+
+from parsel import Selector
+
+from genxpath import _stats
+from genxpath._docs import DocumentCache, content_hash, documents
+from genxpath._io import http_get
+from genxpath._query import query_xpath
+
+if t.TYPE_CHECKING:
+    from cache3 import DiskCache
+
+
+@dataclass
+class _Loaded:
+    # URL or file path.
+    source: str
+    # Content hash the parsed document is cached under.
+    key: bytes
+
+
+class Session:
+    def __init__(self, cache: "DiskCache", docs: DocumentCache = documents):
+        """
+        Args:
+            cache: page cache URLs are loaded through, see `http_get()`.
+        """
+        self.current: str | None = None
+        self._cache = cache
+        self._docs = docs
+        self._loaded = dict[str, _Loaded]()
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._loaded)
+
+    def load(self, name: str, source: str) -> Selector:
+        """Loads a document from a URL or a file and makes it the current one.
+
+        Replaces the document with the same name, if any.
+        """
+        html_doc = self._read(source)
+        self._loaded[name] = _Loaded(source, content_hash(html_doc))
+        self.current = name
+        return self._docs.parse(html_doc)
+
+    def use(self, name: str) -> Selector:
+        """Makes the named document the current one."""
+        doc = self.doc(name)
+        self.current = name
+        return doc
+
+    def doc(self, name: str | None = None) -> Selector:
+        """The named or the current document, parsed again if it was evicted."""
+        loaded = self._get(name)
+        if (doc := self._docs.get(loaded.key)) is None:
+            _stats.count("session.reparses")
+            html_doc = self._read(loaded.source)
+            # The file or the cached page may have changed since.
+            loaded.key = content_hash(html_doc)
+            doc = self._docs.parse(html_doc)
+        return doc
+
+    def is_parsed(self, name: str) -> bool:
+        """Whether the document is still in the cache of parsed documents."""
+        return self._docs.get(self._get(name).key) is not None
+
+    def source(self, name: str) -> str:
+        return self._get(name).source
+
+    def count_all(self, xpath: str) -> dict[str, int]:
+        """Number of results of the XPath in every document, by name.
+
+        Raises `ValueError` if the XPath is invalid.
+        """
+        return {name: len(query_xpath(self.doc(name), xpath)) for name in self._loaded}
+
+    def _get(self, name: str | None) -> _Loaded:
+        name = name or self.current
+        if name is None:
+            raise ValueError("No document loaded")
+        if (loaded := self._loaded.get(name)) is None:
+            raise ValueError(f"No document named {name}")
+        return loaded
+
+    def _read(self, source: str) -> str:
+        if source.startswith("https://"):
+            return http_get(source, self._cache)
+        return Path(source).read_text()
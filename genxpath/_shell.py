@@ -0,0 +1,208 @@
+"""Interactive shell to query, minimize and find XPaths in loaded documents.
+
+Separate from the CLI, so other commands don't import prompt_toolkit and rich.
+"""
+
+import logging
+
+import rich
+from parsel import Selector
+from prompt_toolkit import PromptSession
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.completion import WordCompleter
+from prompt_toolkit.history import InMemoryHistory
+from rich.table import Table
+
+from genxpath import _stats
+from genxpath._gen import find_xpaths_for, minimize_xpath
+from genxpath._query import LiveQuery, query_xpath
+from genxpath._results import ResultSet
+from genxpath._session import Session
+
+
+def run_shell(session: Session):
+    doc = session.doc()
+    # Last query results and where the next page starts.
+    results: ResultSet | None = None
+    next_row = 0
+
+    # What the XPath after "q " selects, updated while it's typed.
+    live_status = ""
+
+    def show_live_result(xpath: str, result: list | ValueError) -> None:
+        nonlocal live_status
+        if isinstance(result, ValueError):
+            live_status = "Invalid XPath"
+        else:
+            live_status = f"{len(result)} found"
+        shell_session.app.invalidate()
+
+    def on_text_changed(buffer: Buffer) -> None:
+        nonlocal live_status
+        cmd, _, xpath = buffer.text.partition(" ")
+        xpath = xpath.strip() if cmd == "q" else ""
+        live_status = "…" if xpath else ""
+        live_query.update(xpath)
+
+    live_query = LiveQuery(doc, show_live_result)
+
+    _print_help()
+    history = InMemoryHistory()
+    auto_complete = WordCompleter(
+        ["q", "qa", "n", "m", "f", "load", "use", "docs", "stats"]
+    )
+    shell_session = PromptSession[str](
+        history=history,
+        completer=auto_complete,
+        bottom_toolbar=lambda: live_status or None,
+    )
+    shell_session.default_buffer.on_text_changed += on_text_changed
+
+    while True:
+        prompt = shell_session.prompt(f"{session.current}> ")
+        if prompt in ("d", "n", "docs", "stats"):
+            cmd = prompt
+            args = ""
+        elif " " in prompt:
+            cmd, args = prompt.split(maxsplit=1)
+        else:
+            _print_help()
+            continue
+
+        match cmd:
+            case "q":
+                if (results := _query_xpath(doc, args)) is not None:
+                    print(f"{len(results)} found")
+                    next_row = _print_results(results, 0)
+            case "qa":
+                _count_all(session, args)
+            case "n":
+                if results is None:
+                    print("No query results")
+                else:
+                    next_row = _print_results(results, next_row)
+            case "m":
+                print(minimize_xpath(doc, args))
+            case "f":
+                for xpath in find_xpaths_for(args, doc):
+                    print(xpath)
+            case "d":
+                rich.print(doc.get())
+            case "load" | "use":
+                name, _, source = args.partition(" ")
+                try:
+                    if cmd == "load":
+                        doc = session.load(name, source.strip() or name)
+                    else:
+                        doc = session.use(name)
+                except (ValueError, OSError) as e:
+                    logging.error(str(e))
+                    continue
+                # Results of the previous document can't be paged anymore.
+                results = None
+                live_query.doc = doc
+            case "docs":
+                _print_docs(session)
+            case "stats":
+                _stats_command(args)
+            case _:
+                logging.error(f"Invalid command: {cmd}")
+
+
+def _print_help():
+    print("HELP:")
+    print("   q - query xpath")
+    print("   n - next page of query results")
+    print("   m - minimize xpath")
+    print("   f - find xpath by value")
+    print("   qa - count xpath results in all loaded documents")
+    print("   load <name> <url|path> - load another document and use it")
+    print("   use <name> - switch to a loaded document")
+    print("   docs - list loaded documents")
+    print("   d - print current document")
+    print("   stats [on|off|reset|save <trace.json>] - timings of XPath generation")
+
+
+def _stats_command(args: str):
+    action, _, path = args.partition(" ")
+    match action:
+        case "":
+            if stats := _stats.active():
+                _print_stats(stats)
+            else:
+                print("Stats are off, turn them on with: stats on")
+        case "on":
+            _stats.enable()
+        case "off":
+            _stats.disable()
+        case "reset":
+            _stats.disable()
+            _stats.enable()
+        case "save" if path:
+            if stats := _stats.active():
+                stats.save_trace(path)
+                print(f"Saved Chrome trace to {path}")
+            else:
+                print("Stats are off, turn them on with: stats on")
+        case _:
+            logging.error(f"Invalid stats command: {args}")
+
+
+def _print_stats(stats: _stats.Stats):
+    table = Table("Name", "Count", "Total", "Max")
+    for name, count, total_ms, max_ms in stats.rows():
+        table.add_row(
+            name,
+            str(count),
+            "" if total_ms is None else f"{total_ms:.2f} ms",
+            "" if max_ms is None else f"{max_ms:.2f} ms",
+        )
+    rich.print(table)
+
+
+def _count_all(session: Session, xpath: str):
+    try:
+        counts = session.count_all(xpath)
+    except ValueError:
+        logging.error(f"Invalid XPath: {xpath}")
+        return
+
+    table = Table("Document", "Found")
+    for name, count in counts.items():
+        table.add_row(name, str(count))
+    rich.print(table)
+
+
+def _print_docs(session: Session):
+    table = Table("", "Document", "Source", "Parsed")
+    for name in session.names:
+        table.add_row(
+            "*" if name == session.current else "",
+            name,
+            session.source(name),
+            # The current document is kept even if evicted from the cache.
+            "yes"
+            if name == session.current or session.is_parsed(name)
+            else "no, on next use",
+        )
+    rich.print(table)
+
+
+def _query_xpath(doc: Selector, xpath: str) -> ResultSet | None:
+    try:
+        return ResultSet(query_xpath(doc, xpath))
+    except ValueError:
+        logging.error(f"Invalid XPath: {xpath}")
+        return None
+
+
+def _print_results(results: ResultSet, start: int) -> int:
+    """Prints a page of results and returns where the next one starts."""
+    page = results.page(start)
+    for i, row in page:
+        rich.print(f"{i}: {row}")
+
+    end = start + len(page)
+    if end < len(results):
+        print(f"... {len(results) - end} more, n - next page")
+    return end
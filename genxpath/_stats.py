@@ -0,0 +1,150 @@
+"""Optional instrumentation of XPath generation.
+
+Disabled by default, in which case `span()` and `count()` return right away. Once
+enabled, counts and timings are collected into a `Stats` object, which can be
+summarized or saved as a Chrome trace for chrome://tracing or Perfetto.
+"""
+
+from collections import Counter, deque
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import threading
+import time
+import typing as t
+
+# Only the latest trace events are kept, counts and timings cover everything.
+MAX_TRACE_EVENTS = 100_000
+
+_P = t.ParamSpec("_P")
+_R = t.TypeVar("_R")
+
+
+@dataclass
+class Timing:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+
+@dataclass
+class Stats:
+    counts: Counter[str] = field(default_factory=Counter)
+    timings: dict[str, Timing] = field(default_factory=dict)
+
+    _events: deque[dict[str, t.Any]] = field(
+        default_factory=lambda: deque(maxlen=MAX_TRACE_EVENTS)
+    )
+    _started: float = field(default_factory=time.perf_counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += n
+
+    def counted(self, name: str, func: t.Callable[_P, _R]) -> t.Callable[_P, _R]:
+        """Wraps `func` to count its calls as `name`."""
+
+        def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+            self.count(name)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    @contextmanager
+    def span(self, name: str, **args: t.Any) -> t.Iterator[None]:
+        """Times the block, `args` are only stored in the trace."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter() - start, args)
+
+    def rows(self) -> list[tuple[str, int, float | None, float | None]]:
+        """(name, count, total ms, max ms) of every span and counter."""
+        with self._lock:
+            rows: list[tuple[str, int, float | None, float | None]] = [
+                (name, timing.count, timing.total * 1000, timing.max * 1000)
+                for name, timing in sorted(self.timings.items())
+            ]
+            rows += [(name, n, None, None) for name, n in sorted(self.counts.items())]
+        return rows
+
+    def trace(self) -> dict[str, t.Any]:
+        """Collected events in the Chrome trace event format."""
+        with self._lock:
+            events = list(self._events)
+            now = self._timestamp(time.perf_counter())
+            events += [
+                {
+                    "name": name,
+                    "ph": "C",
+                    "ts": now,
+                    "pid": os.getpid(),
+                    "args": {name: n},
+                }
+                for name, n in self.counts.items()
+            ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_trace(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.trace()))
+
+    def _record(
+        self, name: str, start: float, duration: float, args: dict[str, t.Any]
+    ) -> None:
+        with self._lock:
+            timing = self.timings.setdefault(name, Timing())
+            timing.count += 1
+            timing.total += duration
+            timing.max = max(timing.max, duration)
+
+            self._events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": self._timestamp(start),
+                    "dur": duration * 1_000_000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def _timestamp(self, perf_counter: float) -> float:
+        """Microseconds since the stats were enabled."""
+        return (perf_counter - self._started) * 1_000_000
+
+
+_active: Stats | None = None
+_NO_SPAN = nullcontext()
+
+
+def enable() -> Stats:
+    """Starts collecting stats, or returns the ones already being collected."""
+    global _active
+    if _active is None:
+        _active = Stats()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> Stats | None:
+    return _active
+
+
+def count(name: str, n: int = 1) -> None:
+    if _active is not None:
+        _active.count(name, n)
+
+
+def span(name: str, **args: t.Any) -> AbstractContextManager[None]:
+    if _active is None:
+        return _NO_SPAN
+    return _active.span(name, **args)
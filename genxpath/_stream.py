@@ -0,0 +1,192 @@
+"""Bounded memory XPath generation for HTML files too large to parse whole.
+
+The document is parsed incrementally and every subtree is discarded as soon as its
+closing tag is seen. Only a small record of the path to each match is kept.
+Minimization needs to know which anchor attribute values are unique in the whole
+document, so the file is read twice: first to find matches, then to count just the
+anchor values on their paths.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+import itertools
+from pathlib import Path
+import typing as t
+
+import lxml.etree as etree
+
+from genxpath._index import ANCHOR_ATTRS, anchor_xpath, normalize_space
+
+
+@dataclass
+class StreamedXpath:
+    xpath: str
+    abs_xpath: str
+
+
+def stream_find_xpaths(
+    model: dict[str, str], path: str | Path
+) -> dict[str, list[StreamedXpath]]:
+    """Same as `find_xpaths`, but streams the document from `path`.
+
+    Each match has both the minimized and the absolute XPath.
+    """
+    fields_by_value = defaultdict[str, list[str]](list)
+    for field_, sample_value in model.items():
+        if sample_value:
+            fields_by_value[sample_value].append(field_)
+
+    matches = _find_matches(path, fields_by_value)
+
+    wanted = {key for match in matches for key in match.elem.anchor_keys()}
+    attr_counts = _count_attrs(path, wanted)
+
+    field_xpaths: dict[str, list[StreamedXpath]] = {f: [] for f in model}
+    # Text matches before attribute matches, each in document order - the same
+    # order find_xpaths() yields them.
+    for match in sorted(matches, key=lambda m: (m.in_attr is not None, m.elem.seq)):
+        xpath = _shortest_unique_xpath(match.elem, attr_counts)
+        abs_xpath = match.elem.abs_xpath()
+        suffix = f"/@{match.in_attr}" if match.in_attr else "/text()"
+        for field_ in fields_by_value[match.value]:
+            field_xpaths[field_].append(
+                StreamedXpath(xpath=xpath + suffix, abs_xpath=abs_xpath + suffix)
+            )
+
+    return field_xpaths
+
+
+@dataclass(eq=False)
+class _Frame:
+    """What we remember about an element after its subtree is discarded."""
+
+    tag: str
+    parent: "_Frame | None"
+    seq: int
+    position: int
+    anchors: dict[str, str]
+    child_tags: dict[str, int] = field(default_factory=dict)
+    first_tail: str | None = None
+
+    def step(self) -> str:
+        # Same as lxml's getpath(): index only if siblings share the tag.
+        if self.parent and self.parent.child_tags[self.tag] > 1:
+            return f"{self.tag}[{self.position}]"
+        return self.tag
+
+    def abs_xpath(self) -> str:
+        steps = list[str]()
+        frame: _Frame | None = self
+        while frame:
+            steps.insert(0, frame.step())
+            frame = frame.parent
+        return "/" + "/".join(steps)
+
+    def anchor_keys(self) -> list[tuple[str, str]]:
+        keys = list[tuple[str, str]]()
+        frame: _Frame | None = self
+        while frame:
+            keys.extend(frame.anchors.items())
+            frame = frame.parent
+        return keys
+
+
+@dataclass
+class _Match:
+    value: str
+    elem: _Frame
+    in_attr: str | None = None
+
+
+def _find_matches(path: str | Path, values: t.Container[str]) -> list[_Match]:
+    matches = list[_Match]()
+    stack = list[_Frame]()
+    seq = itertools.count()
+
+    for event, el in etree.iterparse(
+        str(path), events=("start", "end"), html=True, huge_tree=True
+    ):
+        if not isinstance(el.tag, str):
+            continue
+
+        if event == "start":
+            parent = stack[-1] if stack else None
+            position = 1
+            if parent:
+                position = parent.child_tags[el.tag] = (
+                    parent.child_tags.get(el.tag, 0) + 1
+                )
+            anchors = {}
+            if len(el.attrib):
+                anchors = {a: v for a in ANCHOR_ATTRS if (v := el.get(a)) is not None}
+            stack.append(_Frame(el.tag, parent, next(seq), position, anchors))
+            continue
+
+        frame = stack.pop()
+
+        text = el.text if el.text is not None else frame.first_tail
+        if text is None:
+            text = next((c.tail for c in el if c.tail is not None), "")
+        if text and (text := normalize_space(text)) in values:
+            matches.append(_Match(text, frame))
+
+        for attr, val in el.attrib.items():
+            if val in values and val == normalize_space(val):
+                matches.append(_Match(val, frame, in_attr=str(attr)))
+
+        _discard(el, stack[-1] if stack else None)
+
+    return matches
+
+
+def _count_attrs(
+    path: str | Path, wanted: set[tuple[str, str]]
+) -> Counter[tuple[str, str]]:
+    counts = Counter[tuple[str, str]]()
+    if not wanted:
+        return counts
+
+    for _, el in etree.iterparse(str(path), events=("end",), html=True, huge_tree=True):
+        if not isinstance(el.tag, str):
+            continue
+
+        for attr in ANCHOR_ATTRS:
+            if (val := el.get(attr)) is not None and (attr, val) in wanted:
+                counts[attr, val] += 1
+
+        _discard(el, None)
+
+    return counts
+
+
+def _discard(el: etree._Element, parent_frame: _Frame | None) -> None:
+    """Frees the finished element's subtree and its preceding siblings.
+
+    The element's own tail isn't parsed yet, so the element is kept (empty) until
+    its next sibling ends. Tails of discarded siblings may be the parent's first
+    text node, so the first one is remembered.
+    """
+    el.clear(keep_tail=True)
+
+    if (parent := el.getparent()) is None:
+        return
+
+    while (prev := el.getprevious()) is not None:
+        if parent_frame and parent_frame.first_tail is None and prev.tail is not None:
+            parent_frame.first_tail = prev.tail
+        del parent[0]
+
+
+def _shortest_unique_xpath(elem: _Frame, attr_counts: Counter[tuple[str, str]]) -> str:
+    def attr_count(attr: str, val: str) -> int:
+        return attr_counts[attr, val]
+
+    suffix_steps = list[str]()
+    frame: _Frame | None = elem
+    while frame:
+        if short_xpath := anchor_xpath(frame.anchors, attr_count):
+            return "/".join([short_xpath, *suffix_steps])
+        suffix_steps.insert(0, frame.step())
+        frame = frame.parent
+
+    return elem.abs_xpath()
@@ -0,0 +1,265 @@
+"""Local HTTP JSON API to XPath generation, for scrapers that aren't in Python.
+
+    POST /load      {"html": "..."} or {"url": "https://..."} -> {"doc_id": "..."}
+    POST /find      {"doc_id": "...", "model": {"price": "€9.99"}} -> {"xpaths": {...}}
+    POST /minimize  {"doc_id": "...", "xpath": "..."} -> {"xpath": "..."}
+    POST /query     {"doc_id": "...", "xpath": "..."} -> {"count": 1, "results": [...]}
+
+`/find` takes optional `match` and `prefer`, like `find_xpaths()`, `/query`
+takes optional `offset` and `limit`. A document id is the hash of its HTML, so
+loading the same page again is cheap and returns the same id. Errors are
+{"error": "..."} with status 400, or 404 for a document that's no longer cached.
+
+Documents are parsed and queried in worker processes. Every document id is
+served by the same worker, which keeps the parsed tree and its indexes cached in
+its share of the memory budget, so a document is parsed only once however many
+requests it gets.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import typing as t
+
+from parsel import Selector
+
+from genxpath._docs import content_hash, documents
+from genxpath._gen import Match, Prefer, find_xpaths, minimize_xpath
+from genxpath._io import http_get
+from genxpath._query import query_xpath
+from genxpath._results import PAGE_SIZE, ResultSet
+
+API_PORT = 7004
+# Memory budget for parsed documents, shared by all workers.
+API_CACHE_MB = 1024
+
+# Requests with bigger bodies are refused.
+_MAX_BODY_BYTES = 64 * 1024 * 1024
+
+_R = t.TypeVar("_R")
+
+if t.TYPE_CHECKING:
+    from cache3 import DiskCache
+
+
+class UnknownDocumentError(Exception):
+    """The document was never loaded or was evicted from the cache since."""
+
+
+class Api:
+    """Runs API calls in worker processes, each one serving its share of documents."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        cache_mb: int = API_CACHE_MB,
+        cache: "DiskCache | None" = None,
+    ):
+        """
+        Args:
+            cache: where pages loaded by URL are cached, see `http_get()`, the
+                "cache" directory by default.
+        """
+        workers = workers or os.cpu_count() or 1
+        max_bytes = cache_mb * 1024 * 1024 // workers
+        # One process per shard, a pool would run a document's calls anywhere.
+        self._workers = [
+            ProcessPoolExecutor(
+                max_workers=1, initializer=_init_worker, initargs=(max_bytes,)
+            )
+            for _ in range(workers)
+        ]
+        if cache is None:
+            from cache3 import DiskCache
+
+            cache = DiskCache("cache")
+        self._cache = cache
+
+    def load(self, html_doc: str | None = None, url: str | None = None) -> str:
+        """Parses the document in its worker and returns its id."""
+        if html_doc is None:
+            if not url:
+                raise ValueError("Either html or url is required")
+            html_doc = http_get(url, self._cache)
+
+        doc_id = content_hash(html_doc).hex()
+        self._call(doc_id, _load, html_doc)
+        return doc_id
+
+    def find(
+        self,
+        doc_id: str,
+        model: dict[str, str],
+        match: Match = "exact",
+        prefer: Prefer = "short",
+    ) -> dict[str, list[str]]:
+        return self._call(doc_id, _find, doc_id, model, match, prefer)
+
+    def minimize(self, doc_id: str, xpath: str) -> str:
+        return self._call(doc_id, _minimize, doc_id, xpath)
+
+    def query(
+        self, doc_id: str, xpath: str, offset: int = 0, limit: int = PAGE_SIZE
+    ) -> tuple[int, list[str]]:
+        """Number of results and the serialized ones from `offset` on."""
+        return self._call(doc_id, _query, doc_id, xpath, offset, limit)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.shutdown(cancel_futures=True)
+
+    def _call(self, doc_id: str, fn: t.Callable[..., _R], *args: t.Any) -> _R:
+        try:
+            shard = int(doc_id[:8], 16) % len(self._workers)
+        except ValueError:
+            raise UnknownDocumentError(f"Unknown document: {doc_id}") from None
+        return self._workers[shard].submit(fn, *args).result()
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], api: Api):
+        self.api = api
+        super().__init__(address, _Handler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.api.close()
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = API_PORT,
+    workers: int | None = None,
+    cache_mb: int = API_CACHE_MB,
+) -> None:
+    with ApiServer((host, port), Api(workers, cache_mb)) as server:
+        logging.info(f"Serving the API on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keeps connections open, so clients don't connect for every request.
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, with Nagle's algorithm the body
+    # would wait for the client's delayed ACK of the headers.
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        try:
+            request = self._read_json()
+            if (response := self._dispatch(request)) is None:
+                error = f"Unknown endpoint: {self.path}"
+                status, response = HTTPStatus.NOT_FOUND, {"error": error}
+            else:
+                status = HTTPStatus.OK
+        except UnknownDocumentError as e:
+            status, response = HTTPStatus.NOT_FOUND, {"error": str(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            status, response = HTTPStatus.BAD_REQUEST, {"error": _message(e)}
+        except Exception as e:
+            logging.exception(f"POST {self.path} failed")
+            status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": _message(e)}
+        self._send_json(status, response)
+
+    def _dispatch(self, request: dict[str, t.Any]) -> dict[str, t.Any] | None:
+        api = t.cast(ApiServer, self.server).api
+        match self.path:
+            case "/load":
+                doc_id = api.load(request.get("html"), request.get("url"))
+                return {"doc_id": doc_id}
+            case "/find":
+                xpaths = api.find(
+                    request["doc_id"],
+                    request["model"],
+                    request.get("match", "exact"),
+                    request.get("prefer", "short"),
+                )
+                return {"xpaths": xpaths}
+            case "/minimize":
+                return {"xpath": api.minimize(request["doc_id"], request["xpath"])}
+            case "/query":
+                count, results = api.query(
+                    request["doc_id"],
+                    request["xpath"],
+                    int(request.get("offset", 0)),
+                    int(request.get("limit", PAGE_SIZE)),
+                )
+                return {"count": count, "results": results}
+            case _:
+                return None
+
+    def _read_json(self) -> dict[str, t.Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY_BYTES:
+            # The body isn't read, so the connection can't be reused.
+            self.close_connection = True
+            raise ValueError("Request body is too big")
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(request, dict):
+            raise ValueError("Request body must be a JSON object")
+        return request
+
+    def _send_json(self, status: HTTPStatus, response: dict[str, t.Any]) -> None:
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: t.Any) -> None:
+        # Hundreds of requests per second would flood the log.
+        logging.debug(format % args)
+
+
+def _message(e: Exception) -> str:
+    if isinstance(e, KeyError):
+        return f"Missing {e}"
+    return str(e) or type(e).__name__
+
+
+def _init_worker(max_bytes: int) -> None:
+    documents.max_bytes = max_bytes
+
+
+def _doc(doc_id: str) -> Selector:
+    try:
+        key = bytes.fromhex(doc_id)
+    except ValueError:
+        key = None
+    if key is None or (doc := documents.get(key)) is None:
+        raise UnknownDocumentError(f"Unknown document: {doc_id}, load it again")
+    return doc
+
+
+def _load(html_doc: str) -> None:
+    documents.parse(html_doc)
+    if documents.get(content_hash(html_doc)) is None:
+        raise ValueError("Document is too big for the cache")
+
+
+def _find(
+    doc_id: str, model: dict[str, str], match: Match, prefer: Prefer
+) -> dict[str, list[str]]:
+    if match not in t.get_args(Match):
+        raise ValueError(f"Invalid match: {match}")
+    if prefer not in t.get_args(Prefer):
+        raise ValueError(f"Invalid prefer: {prefer}")
+    return find_xpaths(model, _doc(doc_id), match, prefer)
+
+
+def _minimize(doc_id: str, xpath: str) -> str:
+    return minimize_xpath(_doc(doc_id), xpath)
+
+
+def _query(doc_id: str, xpath: str, offset: int, limit: int) -> tuple[int, list[str]]:
+    results = ResultSet(query_xpath(_doc(doc_id), xpath))
+    return len(results), [row for _, row in results.page(offset, limit)]
@@ -1,28 +1,98 @@
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import math
+import re
 import typing as t
 import asyncio
+from threading import Condition
+import time
 
+import lxml.etree as etree
 from rich.text import Text
+from textual import work
 from textual.app import App, ComposeResult
+from textual.cache import LRUCache
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.timer import Timer
 from textual.widgets import (
     Footer,
     Header,
     Static,
     Input,
-    Markdown,
     Button,
     DataTable,
     Label,
 )
 from textual.message import Message
-from textual.containers import VerticalScroll, Horizontal, Vertical
+from textual.containers import Horizontal, Vertical
 from textual.reactive import reactive
+from textual.worker import get_current_worker
 from cache3 import DiskCache
 from parsel import Selector
 
+from genxpath import _stats
+from genxpath._docs import parse_html
+from genxpath._dom_sync import DomChange, DomSyncError, apply_dom_changes
 from genxpath._io import http_get
-from genxpath._gen import find_xpaths_for, minimize_xpath
+from genxpath._gen import iter_xpaths_for, minimize_xpath
+from genxpath._query import QUERY_DELAY_SECONDS, memoized_query, query_xpath
+from genxpath._results import ResultSet
 from genxpath._browser import WebBrowser
 
+# Where the stats panel saves Chrome traces.
+_TRACE_PATH = "genxpath-trace.json"
+# How often a running search delivers the XPaths found so far.
+_RESULTS_INTERVAL_SECONDS = 0.1
+
+# Longer lines of the HTML source are split into rows of this many characters.
+_ROW_CHARS = 1000
+# libxml2 stops counting source lines here.
+_MAX_SOURCELINE = 65535
+
+# Last step of a generated XPath, that selects out of the element.
+_TEXT_OR_ATTR_STEP = re.compile(r"/(?:text\(\)|@[^/]+)$")
+
+_HTML_TAG = re.compile(r"<!--.*?(?:-->|$)|<[^>]*>?")
+_HTML_TAG_NAME = re.compile(r"</?[\w:.-]*")
+_HTML_ATTR = re.compile(r"""([^\s=/>]+)(?:\s*=\s*("[^"]*"?|'[^']*'?|[^\s>]+))?""")
+
+
+class _DocLock:
+    """Searches and queries read the document together, changes wait for them."""
+
+    def __init__(self):
+        self._condition = Condition()
+        self._readers = 0
+        self._writing = False
+
+    @contextmanager
+    def reading(self) -> t.Iterator[None]:
+        with self._condition:
+            self._condition.wait_for(lambda: not self._writing)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+
+    def try_writing(self) -> bool:
+        """True if there are no readers, then new ones wait for `done_writing()`."""
+        with self._condition:
+            if self._readers:
+                return False
+            self._writing = True
+            return True
+
+    def done_writing(self) -> None:
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
 
 class FindValueInput(Input):
     BORDER_TITLE = "Find xpath to value"
@@ -48,29 +118,77 @@ class QueryXpath(Static):
     doc: reactive[Selector | None] = reactive(None)
 
     class SelectedHtmlElements(Message):
-        def __init__(self, elements: list[Selector]):
+        def __init__(self, elements: ResultSet):
             self.elements = elements
             super().__init__()
 
+    def __init__(self, doc_lock: _DocLock, *args: t.Any, **kwargs: t.Any):
+        super().__init__(*args, **kwargs)
+
+        self._doc_lock = doc_lock
+        self._query_timer: Timer | None = None
+
     def compose(self) -> ComposeResult:
         with Horizontal():
             yield Button("Minimize", tooltip="Find a shorter XPath")
             yield Input(placeholder="//*[@id='product']")
 
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self._query(event.value, live=True)
+
     def on_input_submitted(self, event: Input.Submitted) -> None:
-        if not self.doc:
-            self.notify("No document loaded")
+        self._query(event.value, live=False)
+
+    def _query(self, xpath: str, live: bool) -> None:
+        """Shows what the XPath selects, right away if it already ran.
+
+        Live queries wait for typing to pause and don't complain about XPaths
+        that are only half typed.
+        """
+        if self._query_timer is not None:
+            self._query_timer.stop()
+        self.workers.cancel_group(self, "query")
+
+        if (doc := self.doc) is None:
+            if not live:
+                self.notify("No document loaded")
+            return
+        if not (xpath := xpath.strip()):
             return
 
-        xpath = event.value
-        try:
-            elements = self.doc.xpath(xpath)
-            self.post_message(self.SelectedHtmlElements(elements))
-        except ValueError:
-            self.notify("Invalid XPath: " + xpath, markup=False)
+        if (found := memoized_query(doc, xpath)) is not None:
+            self._show_results(doc, found)
+        elif live:
+            self._query_timer = self.set_timer(
+                QUERY_DELAY_SECONDS, lambda: self._run_query(doc, xpath, live)
+            )
+        else:
+            self._run_query(doc, xpath, live)
+
+    @work(thread=True, exclusive=True, group="query")
+    def _run_query(self, doc: Selector, xpath: str, live: bool) -> None:
+        worker = get_current_worker()
+        with self._doc_lock.reading():
+            if worker.is_cancelled:
+                return
+            try:
+                found = query_xpath(doc, xpath)
+            except ValueError:
+                if not live and not worker.is_cancelled:
+                    self.app.call_from_thread(
+                        self.notify, "Invalid XPath: " + xpath, markup=False
+                    )
+                return
+
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self._show_results, doc, found)
+
+    def _show_results(self, doc: Selector, found: list[t.Any]) -> None:
+        if doc is self.doc:
+            self.post_message(self.SelectedHtmlElements(ResultSet(found)))
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
-        if not self.doc:
+        if self.doc is None:
             self.notify("No document loaded")
             return
 
@@ -96,15 +214,32 @@ class Controls(Static):
             self.html = html
             super().__init__()
 
+    class LoadFailed(Message):
+        pass
+
+    class FindingXpaths(Message):
+        def __init__(self, search_id: int):
+            self.search_id = search_id
+            super().__init__()
+
     class FoundXpaths(Message):
-        def __init__(self, xpaths: list[str]):
+        """Next XPaths of the search, `done` once it's the last batch."""
+
+        def __init__(self, search_id: int, xpaths: list[str], done: bool):
+            self.search_id = search_id
             self.xpaths = xpaths
+            self.done = done
             super().__init__()
 
     def __init__(self, cache: DiskCache, *args: t.Any, **kwargs: t.Any):
         super().__init__(*args, **kwargs)
 
         self._cache = cache
+        self._search_id = 0
+        # The page open in the browser, kept in sync with it.
+        self._browser_doc: Selector | None = None
+        # Searches and queries run in threads, the document mustn't change under them.
+        self._doc_lock = _DocLock()
 
     def compose(self) -> ComposeResult:
         self._url_input = Input(placeholder="URL or file path", id="url-input")
@@ -112,7 +247,7 @@ class Controls(Static):
         yield FindValueInput(
             placeholder="Sample text in the document", id="value-input"
         )
-        yield QueryXpath()
+        yield QueryXpath(self._doc_lock)
 
     def on_mount(self) -> None:
         # If it stays focused, for some reasons some random characters are inserted
@@ -131,32 +266,277 @@ class Controls(Static):
         elif event.input.id == "value-input" and event.value:
             self._find_xpaths(event.value)
 
-    def load_html(self, html: str) -> None:
-        self.loaded_doc = Selector(text=html)
-        self.post_message(self.LoadedHtml(html))
+    def on_controls_found_xpaths(self, event: FoundXpaths) -> None:
+        # A cancelled search may still deliver what it found before it noticed.
+        if event.search_id != self._search_id:
+            event.stop()
+
+    async def load_browser_html(self, html: str) -> None:
+        """Shows the page from the browser, to be updated by `apply_dom_changes()`."""
+        self.workers.cancel_group(self, "load")
+        # Not through the shared cache, the document is changed in place.
+        with _stats.span("parse", bytes=len(html)):
+            doc = await asyncio.to_thread(Selector, text=html)
+        self._set_doc(doc, html)
+        self._browser_doc = doc
+
+    async def apply_dom_changes(self, changes: list[DomChange]) -> bool:
+        """Applies changes in the browser's page, False if it has to be reloaded."""
+        doc = self._browser_doc
+        # Another document is shown meanwhile, or the page is being reloaded.
+        if doc is None or doc is not self.loaded_doc:
+            return True
+
+        while not self._doc_lock.try_writing():
+            await asyncio.sleep(_RESULTS_INTERVAL_SECONDS)
+        try:
+            with _stats.span("apply_dom_changes", changes=len(changes)):
+                apply_dom_changes(doc, changes)
+        except DomSyncError:
+            self._browser_doc = None
+            return False
+        finally:
+            self._doc_lock.done_writing()
 
+        return True
+
+    @work(thread=True, exclusive=True, group="load")
     def _fetch_html(self, url: str) -> None:
         self.post_message(self.LoadingUrl(url))
 
         try:
             html_doc = http_get(url, self._cache)
-            self.load_html(html_doc)
-            self._cache.set("last_url_loaded", url)
+            if get_current_worker().is_cancelled:
+                return
+            doc = parse_html(html_doc)
         except Exception as e:
-            self.notify("Error fetching HTML: " + str(e), markup=False)
+            self.post_message(self.LoadFailed())
+            self.app.call_from_thread(
+                self.notify, "Error fetching HTML: " + str(e), markup=False
+            )
+            return
+
+        if not get_current_worker().is_cancelled:
+            self.app.call_from_thread(self._set_doc, doc, html_doc)
+            self._cache.set("last_url_loaded", url)
+
+    def _set_doc(self, doc: Selector, html: str) -> None:
+        # Results for the previous document are of no use anymore.
+        self.workers.cancel_group(self, "find")
+        self._search_id += 1
+
+        self.loaded_doc = doc
+        self._browser_doc = None
+        self.post_message(self.LoadedHtml(html))
 
     def _find_xpaths(self, value: str) -> None:
-        if not self.loaded_doc:
+        if self.loaded_doc is None:
             self.notify("No document loaded")
             return
 
-        xpaths = find_xpaths_for(value, self.loaded_doc)
-        self.post_message(self.FoundXpaths(xpaths))
+        self._search_id += 1
+        self.post_message(self.FindingXpaths(self._search_id))
+        self._find_xpaths_worker(self._search_id, value, self.loaded_doc)
+
+    @work(thread=True, exclusive=True, group="find")
+    def _find_xpaths_worker(self, search_id: int, value: str, doc: Selector) -> None:
+        worker = get_current_worker()
+        found = list[str]()
+        last_posted = time.monotonic()
+
+        with self._doc_lock.reading():
+            for xpath in iter_xpaths_for(value, doc):
+                if worker.is_cancelled:
+                    return
+
+                found.append(xpath)
+                # Batch results, a message per XPath would flood the UI.
+                if time.monotonic() - last_posted >= _RESULTS_INTERVAL_SECONDS:
+                    self.post_message(self.FoundXpaths(search_id, found, done=False))
+                    found = []
+                    last_posted = time.monotonic()
+
+        if not worker.is_cancelled:
+            self.post_message(self.FoundXpaths(search_id, found, done=True))
+
+
+@dataclass(frozen=True)
+class _SourceLines:
+    """Where lines and rows of an HTML source start."""
+
+    html: str = ""
+    # Offset where every line starts.
+    line_starts: array = field(default_factory=lambda: array("q", [0]))
+    # First row of every line, and the total number of rows at the end.
+    line_rows: array = field(default_factory=lambda: array("q", [0, 1]))
+    # parsel strips leading whitespace before parsing, so element source lines
+    # are off by the number of leading newlines.
+    line_offset: int = 0
+    width: int = 0
+
+    @classmethod
+    def index(cls, html: str) -> "_SourceLines":
+        line_starts = array("q", [0])
+        line_starts.extend(m.end() for m in re.finditer("\n", html))
+        line_ends = [*line_starts[1:], len(html) + 1]
+
+        line_rows = array("q", [0])
+        rows = width = 0
+        for start, end in zip(line_starts, line_ends):
+            rows += max(1, math.ceil((end - 1 - start) / _ROW_CHARS))
+            line_rows.append(rows)
+            width = max(width, end - 1 - start)
+
+        return cls(
+            html=html,
+            line_starts=line_starts,
+            line_rows=line_rows,
+            line_offset=html[: len(html) - len(html.lstrip())].count("\n"),
+            width=min(width, _ROW_CHARS),
+        )
+
+    @property
+    def rows(self) -> int:
+        return self.line_rows[-1]
+
+    def row_text(self, row: int) -> str:
+        line = bisect_right(self.line_rows, row) - 1
+        start = self.line_starts[line] + (row - self.line_rows[line]) * _ROW_CHARS
+        if line + 1 < len(self.line_starts):
+            line_end = self.line_starts[line + 1] - 1
+        else:
+            line_end = len(self.html)
+        return self.html[start : min(start + _ROW_CHARS, line_end)].rstrip("\r")
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """Row and column of the character at `offset`."""
+        line = bisect_right(self.line_starts, offset) - 1
+        row, column = divmod(offset - self.line_starts[line], _ROW_CHARS)
+        return self.line_rows[line] + row, column
+
+    def start_tag_offset(self, element: etree._Element) -> int | None:
+        if not isinstance(element.tag, str) or element.sourceline is None:
+            return None
+
+        sourceline = min(element.sourceline, _MAX_SOURCELINE)
+        line = sourceline - 1 + self.line_offset
+        if line >= len(self.line_starts):
+            return None
+
+        # The element is the n-th start tag with its name, counting from its line.
+        nth = 0
+        for other in element.getroottree().iter(element.tag):
+            if other is element:
+                break
+            if min(other.sourceline or 0, _MAX_SOURCELINE) == sourceline:
+                nth += 1
+
+        start_tag = re.compile(rf"<{re.escape(element.tag)}[\s/>]", re.IGNORECASE)
+        matches = start_tag.finditer(self.html, self.line_starts[line])
+        for i, match in enumerate(matches):
+            if i == nth:
+                return match.start()
+        return None
+
+
+class HtmlSource(ScrollView):
+    """HTML source viewer that highlights only the lines on screen.
+
+    Long lines are split into rows of at most `_ROW_CHARS` characters, so that a
+    minified page doesn't have to be highlighted all at once either.
+    """
+
+    COMPONENT_CLASSES = {"html-source--selected"}
+    DEFAULT_CSS = """
+    HtmlSource > .html-source--selected {
+        background: $accent 30%;
+    }
+    """
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any):
+        super().__init__(*args, **kwargs)
+
+        self._source = _SourceLines()
+        self._selected_row: int | None = None
+        self._strips = LRUCache[int, Strip](1024)
+
+    @work(thread=True, exclusive=True)
+    def update_html(self, html: str) -> None:
+        # Indexing lines of a big page takes a while, do it off the event loop.
+        source = _SourceLines.index(html)
+        if not get_current_worker().is_cancelled:
+            self.app.call_from_thread(self._show_source, source)
+
+    def show_element(self, element: etree._Element) -> None:
+        """Scrolls to the start tag of the element and highlights it."""
+        if (offset := self._source.start_tag_offset(element)) is None:
+            return
+
+        row, column = self._source.position(offset)
+        self._selected_row = row
+        self.scroll_to(
+            x=max(0, column - self.size.width // 3),
+            y=max(0, row - self.size.height // 3),
+            animate=False,
+        )
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row = scroll_y + y
+        width = self.scrollable_content_region.width
+        if row >= self._source.rows:
+            return Strip.blank(width, self.rich_style)
+
+        if (strip := self._strips.get(row)) is None:
+            text = _highlight_html(self._source.row_text(row))
+            strip = Strip(text.render(self.app.console), text.cell_len)
+            self._strips[row] = strip
+
+        strip = strip.crop_extend(scroll_x, scroll_x + width, self.rich_style)
+        if row == self._selected_row:
+            strip = strip.apply_style(
+                self.get_component_rich_style("html-source--selected")
+            )
+        return strip
+
+    def _show_source(self, source: _SourceLines) -> None:
+        self._source = source
+        self._selected_row = None
+        self._strips.clear()
+
+        self.virtual_size = Size(source.width, source.rows)
+        self.scroll_home(animate=False)
+        self.refresh()
+
+
+def _highlight_html(source: str) -> Text:
+    """Highlights tags in a fragment of HTML, e.g. one line of it."""
+    text = Text(source)
+    for tag in _HTML_TAG.finditer(source):
+        start, end = tag.span()
+        if tag.group().startswith("<!--"):
+            text.stylize("dim", start, end)
+            continue
+
+        name = _HTML_TAG_NAME.match(source, start)
+        name_end = name.end() if name else start + 1
+        text.stylize("bold blue", start, name_end)
+        if tag.group().endswith(">"):
+            end -= 1
+            text.stylize("bold blue", end, end + 1)
+
+        for attr in _HTML_ATTR.finditer(source, name_end, end):
+            text.stylize("green", *attr.span(1))
+            if attr.group(2):
+                text.stylize("yellow", *attr.span(2))
+
+    return text
 
 
 class ViewHtml(Static):
     DEFAULT_CSS = """
-    VerticalScroll {
+    HtmlSource {
         height: 50%;
     }
 
@@ -165,32 +545,132 @@ class ViewHtml(Static):
     }
     """
 
+    doc: reactive[Selector | None] = reactive(None)
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any):
+        super().__init__(*args, **kwargs)
+
+        # What the table lists: query results, or XPaths found for a value.
+        self._results: ResultSet | None = None
+        self._xpaths = list[str]()
+
     def compose(self) -> ComposeResult:
         with Vertical():
-            with VerticalScroll():
-                yield Markdown()
-
-            yield DataTable(name="HTML elements")
+            yield HtmlSource()
+            yield DataTable(name="HTML elements", cursor_type="row")
 
     def on_mount(self) -> None:
         table = self.query_one(DataTable)
         table.add_columns("Nr.", "Element")
+        self.watch(table, "scroll_y", self._load_more_results)
 
     def update_html(self, html: str) -> None:
-        self.query_one(Markdown).update(html)
+        self.query_one(HtmlSource).update_html(html)
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        self._show_row(event.cursor_row)
+        self._load_more_results()
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        self._show_row(event.cursor_row)
 
-    def list_html_elements(self, elements: list[Selector]) -> None:
+    def _show_row(self, index: int) -> None:
+        """Scrolls the source to the element in the table row."""
+        if self._results is not None:
+            row = self._results[index] if index < len(self._results) else None
+        elif index < len(self._xpaths):
+            row = self._element_at(self._xpaths[index])
+        else:
+            row = None
+
+        if row is not None and isinstance(row.root, etree._Element):
+            self.query_one(HtmlSource).show_element(row.root)
+
+    def list_html_elements(self, elements: ResultSet) -> None:
         table = self.query_one(DataTable)
         table.clear()
-        for i, el in enumerate(elements):
-            table.add_row(i, el.get())
+        self._results = elements
+        self.border_subtitle = f"{len(elements)} found"
+        self._load_more_results()
 
-    def list_xpaths(self, xpaths: list[str]) -> None:
+    def start_xpaths(self) -> None:
         table = self.query_one(DataTable)
         table.clear()
+        self._results = None
+        self._xpaths = []
+        self.border_subtitle = "Searching..."
+
+    def add_xpaths(self, xpaths: list[str], done: bool) -> None:
+        table = self.query_one(DataTable)
+        self._xpaths += xpaths
+        for xpath in xpaths:
+            table.add_row(table.row_count, Text(xpath))
 
-        for i, xpath in enumerate(xpaths):
-            table.add_row(i, Text(xpath))
+        found = f"{table.row_count} found"
+        self.border_subtitle = found if done else f"Searching... {found}"
+
+    def _load_more_results(self) -> None:
+        """Serializes the next page of query results once the end is in view."""
+        table = self.query_one(DataTable)
+        if self._results is None or table.row_count >= len(self._results):
+            return
+
+        rows_below = table.row_count - max(table.cursor_row, table.scroll_y)
+        if table.row_count and rows_below > table.size.height:
+            return
+
+        for i, row in self._results.page(table.row_count):
+            table.add_row(i, Text(row))
+
+    def _element_at(self, xpath: str) -> Selector | None:
+        """The element a generated XPath points into."""
+        if self.doc is None:
+            return None
+
+        try:
+            found = self.doc.xpath(_TEXT_OR_ATTR_STEP.sub("", xpath))
+        except ValueError:
+            return None
+        return found[0] if found else None
+
+
+class StatsPanel(Static):
+    """Timings of XPath generation, collected while the panel is shown."""
+
+    BORDER_TITLE = "Stats"
+    DEFAULT_CSS = """
+    StatsPanel {
+        display: none;
+        height: 14;
+        border: solid $primary-background-lighten-2;
+        border-title-align: center;
+    }
+
+    StatsPanel.-visible {
+        display: block;
+    }
+    """
+
+    def compose(self) -> ComposeResult:
+        yield DataTable()
+
+    def on_mount(self) -> None:
+        self.query_one(DataTable).add_columns("Name", "Count", "Total", "Max")
+        self.set_interval(1, self.refresh_stats)
+
+    def refresh_stats(self) -> None:
+        if not (stats := _stats.active()):
+            return
+
+        table = self.query_one(DataTable)
+        table.clear()
+        for name, count, total_ms, max_ms in stats.rows():
+            table.add_row(
+                name,
+                count,
+                "" if total_ms is None else f"{total_ms:.2f} ms",
+                "" if max_ms is None else f"{max_ms:.2f} ms",
+            )
 
 
 class XpathGenerator(App):
@@ -202,6 +682,8 @@ class XpathGenerator(App):
     BINDINGS = [
         ("d", "toggle_dark", "Toggle dark mode"),
         ("ctrl+shift+q", "quit", "Quit"),
+        ("f2", "toggle_stats", "Stats"),
+        ("f3", "save_trace", "Save trace"),
     ]
 
     DEFAULT_CSS = """
@@ -245,6 +727,8 @@ class XpathGenerator(App):
                 yield Controls(self._cache)
                 yield ViewHtml()
 
+            yield StatsPanel()
+
             self._xpath_from_browser = Label("")
             yield self._xpath_from_browser
 
@@ -263,15 +747,19 @@ class XpathGenerator(App):
 
         while True:
             try:
-                event = await self._web_browser.events.get()
+                event = await self._web_browser.next_event()
                 match event["event"]:
                     case "html_loaded":
-                        self.query_one(Controls).load_html(event["html"])
+                        await self.query_one(Controls).load_browser_html(event["html"])
+                    case "dom_changed":
+                        controls = self.query_one(Controls)
+                        if not await controls.apply_dom_changes(event["changes"]):
+                            await self._web_browser.resync()
                     case "element_hover":
                         min_xpath = event["xpath"]
 
                         # TODO: move loaded_doc ownership to the App instance?
-                        if doc := self.query_one(Controls).loaded_doc:
+                        if (doc := self.query_one(Controls).loaded_doc) is not None:
                             try:
                                 min_xpath = minimize_xpath(doc, event["xpath"])
                             except ValueError:
@@ -285,19 +773,45 @@ class XpathGenerator(App):
                 break
 
     def on_controls_loading_url(self, event: Controls.LoadingUrl) -> None:
-        self.query_one(ViewHtml).update_html("Loading...")
+        self.query_one(ViewHtml).loading = True
+
+    def on_controls_load_failed(self, event: Controls.LoadFailed) -> None:
+        self.query_one(ViewHtml).loading = False
 
     def on_controls_loaded_html(self, event: Controls.LoadedHtml) -> None:
-        self.query_one(ViewHtml).update_html(f"```html\n{event.html}\n```")
+        view = self.query_one(ViewHtml)
+        view.loading = False
+        view.doc = self.query_one(Controls).loaded_doc
+        view.update_html(event.html)
+
+    def on_controls_finding_xpaths(self, event: Controls.FindingXpaths) -> None:
+        self.query_one(ViewHtml).start_xpaths()
 
     def on_controls_found_xpaths(self, event: Controls.FoundXpaths) -> None:
-        self.query_one(ViewHtml).list_xpaths(event.xpaths)
+        self.query_one(ViewHtml).add_xpaths(event.xpaths, event.done)
 
     def on_query_xpath_selected_html_elements(
         self, event: QueryXpath.SelectedHtmlElements
     ) -> None:
         self.query_one(ViewHtml).list_html_elements(event.elements)
 
+    def action_toggle_stats(self) -> None:
+        panel = self.query_one(StatsPanel)
+        panel.toggle_class("-visible")
+        if panel.has_class("-visible"):
+            _stats.enable()
+            panel.refresh_stats()
+        else:
+            _stats.disable()
+
+    def action_save_trace(self) -> None:
+        if not (stats := _stats.active()):
+            self.notify("Stats are off, open the stats panel first")
+            return
+
+        stats.save_trace(_TRACE_PATH)
+        self.notify(f"Saved Chrome trace to {_TRACE_PATH}")
+
     def action_toggle_dark(self) -> None:
         """An action to toggle dark mode."""
         self.theme = (
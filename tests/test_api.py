@@ -0,0 +1,84 @@
+from http.client import HTTPConnection
+import json
+import threading
+import typing as t
+
+import pytest
+from cache3 import DiskCache
+
+from genxpath.api import Api, ApiServer
+
+HTML_DOC = """
+<html><body>
+<div class="product">
+    <span class="price" id="sales-price">€199.99</span>
+</div>
+<div class="product"><span class="price">€299.99</span></div>
+</body></html>
+"""
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory: pytest.TempPathFactory) -> t.Iterator[HTTPConnection]:
+    cache = DiskCache(str(tmp_path_factory.mktemp("cache")))
+    server = ApiServer(("127.0.0.1", 0), Api(workers=2, cache=cache))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    conn = HTTPConnection("127.0.0.1", server.server_port, timeout=30)
+    yield conn
+
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+def _post(conn: HTTPConnection, path: str, request: dict) -> tuple[int, dict]:
+    conn.request("POST", path, json.dumps(request))
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read())
+
+
+class TestApi:
+    def test_load_returns_same_id_for_same_document(self, conn: HTTPConnection):
+        status, loaded = _post(conn, "/load", {"html": HTML_DOC})
+
+        assert status == 200
+        assert _post(conn, "/load", {"html": HTML_DOC})[1] == loaded
+
+    def test_find_minimize_and_query(self, conn: HTTPConnection):
+        doc_id = _post(conn, "/load", {"html": HTML_DOC})[1]["doc_id"]
+
+        status, found = _post(
+            conn, "/find", {"doc_id": doc_id, "model": {"price": "€199.99"}}
+        )
+        assert (status, found) == (
+            200,
+            {"xpaths": {"price": ["//*[@id='sales-price']/text()"]}},
+        )
+
+        status, minimized = _post(
+            conn, "/minimize", {"doc_id": doc_id, "xpath": "/html/body/div[1]/span"}
+        )
+        assert minimized == {"xpath": "//*[@id='sales-price']"}
+
+        status, queried = _post(
+            conn, "/query", {"doc_id": doc_id, "xpath": "//span/text()", "limit": 1}
+        )
+        assert queried == {"count": 2, "results": ["€199.99"]}
+
+    def test_unknown_document(self, conn: HTTPConnection):
+        status, error = _post(conn, "/find", {"doc_id": "00" * 16, "model": {}})
+
+        assert status == 404
+        assert "Unknown document" in error["error"]
+
+    def test_invalid_requests(self, conn: HTTPConnection):
+        doc_id = _post(conn, "/load", {"html": HTML_DOC})[1]["doc_id"]
+
+        assert _post(conn, "/query", {"doc_id": doc_id, "xpath": "//["})[0] == 400
+        assert _post(conn, "/find", {"doc_id": doc_id}) == (
+            400,
+            {"error": "Missing 'model'"},
+        )
+        assert _post(conn, "/nothing", {})[0] == 404
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from cache3 import DiskCache
+
+from genxpath import _batch
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> DiskCache:
+    return DiskCache(str(tmp_path / "cache"))
+
+
+def _run(lines: list[str], cache: DiskCache, **options) -> list[dict]:
+    output = list[str]()
+    asyncio.run(_batch.run_batch(lines, cache, output.append, workers=1, **options))
+    return sorted((json.loads(line) for line in output), key=lambda r: r["line"])
+
+
+class TestRunBatch:
+    def test_writes_result_for_every_job(self, tmp_path: Path, cache: DiskCache):
+        page = tmp_path / "page.html"
+        page.write_text("<html><body><p id='price'>199.99</p></body></html>")
+
+        results = _run(
+            [
+                json.dumps({"path": str(page), "model": {"price": "199.99"}}),
+                "",
+                "not json",
+                json.dumps({"model": {"price": "199.99"}}),
+            ],
+            cache,
+        )
+
+        assert results[0] == {
+            "line": 1,
+            "path": str(page),
+            "xpaths": {"price": ["//*[@id='price']/text()"]},
+        }
+        assert [r["line"] for r in results] == [1, 3, 4]
+        assert "error" in results[1]
+        assert results[2]["error"] == "Job must have a url or a path"
+
+    def test_limits_jobs_in_flight(self, monkeypatch, cache: DiskCache):
+        fetching = 0
+        max_fetching = 0
+
+        async def fake_fetch(url: str, cache: DiskCache) -> str:
+            nonlocal fetching, max_fetching
+            fetching += 1
+            max_fetching = max(max_fetching, fetching)
+            await asyncio.sleep(0.01)
+            fetching -= 1
+            return f"<html><body><p>{url}</p></body></html>"
+
+        monkeypatch.setattr(_batch, "fetch", fake_fetch)
+        jobs = [
+            json.dumps({"url": f"https://example.com/{i}", "model": {"url": "x"}})
+            for i in range(10)
+        ]
+
+        results = _run(jobs, cache, max_in_flight=3)
+
+        assert len(results) == 10
+        assert max_fetching == 3
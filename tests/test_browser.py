@@ -0,0 +1,161 @@
+import asyncio
+
+from cache3 import DiskCache
+
+from genxpath import _io
+from genxpath._browser import RenderPool, WebBrowser
+
+
+class TestWebBrowser:
+    def test_next_event_skips_stale_hovers(self):
+        async def events() -> list:
+            browser = WebBrowser()
+            for event in [
+                {"event": "element_hover", "xpath": "/html/body/p[1]", "seq": 1},
+                {"event": "element_hover", "xpath": "/html/body/p[2]", "seq": 2},
+                {"event": "html_loaded", "html": "<html></html>"},
+                {"event": "element_hover", "xpath": "/html/body/p[3]", "seq": 2},
+                {"event": "element_hover", "xpath": "/html/body/p[4]", "seq": 1},
+            ]:
+                browser.events.put_nowait(event)  # type: ignore[arg-type]
+
+            return [await browser.next_event() for _ in range(2)]
+
+        assert asyncio.run(events()) == [
+            {"event": "html_loaded", "html": "<html></html>"},
+            {"event": "element_hover", "xpath": "/html/body/p[4]", "seq": 1},
+        ]
+
+    def test_next_event_drops_hovers_delivered_out_of_order(self):
+        async def events() -> list:
+            browser = WebBrowser()
+            browser.events.put_nowait(
+                {"event": "element_hover", "xpath": "/html/body/p[2]", "seq": 2}
+            )
+            first = await browser.next_event()
+
+            next_event = asyncio.create_task(browser.next_event())
+            browser.events.put_nowait(
+                {"event": "element_hover", "xpath": "/html/body/p[1]", "seq": 1}
+            )
+            await asyncio.sleep(0)
+            assert not next_event.done()
+            browser.events.put_nowait(
+                {"event": "element_hover", "xpath": "/html/body/p[3]", "seq": 3}
+            )
+            return [first, await next_event]
+
+        assert [e["seq"] for e in asyncio.run(events())] == [2, 3]
+
+
+class FakeResponse:
+    status = 200
+
+
+class FakePage:
+    def __init__(self):
+        self.urls = list[str]()
+
+    async def goto(self, url: str, **kwargs) -> FakeResponse:
+        self.urls.append(url)
+        return FakeResponse()
+
+    async def content(self) -> str:
+        return f"<html><body>{self.urls[-1]}</body></html>"
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.closed = False
+
+    async def route(self, pattern: str, handler) -> None:
+        self.handler = handler
+
+    async def new_page(self) -> FakePage:
+        return self.page
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = list[FakeContext]()
+
+    async def new_context(self) -> FakeContext:
+        self.contexts.append(FakeContext())
+        return self.contexts[-1]
+
+
+class FakeRoute:
+    def __init__(self, resource_type: str):
+        self.request = self
+        self.resource_type = resource_type
+        self.result = ""
+
+    async def abort(self) -> None:
+        self.result = "aborted"
+
+    async def continue_(self) -> None:
+        self.result = "continued"
+
+
+class TestRenderPool:
+    def _pool(self, cache: DiskCache, browser: FakeBrowser, **kwargs) -> RenderPool:
+        pool = RenderPool(cache, pages=1, **kwargs)
+        pool._browser = browser  # type: ignore[assignment]
+
+        async def start() -> None:
+            pool._slots.put_nowait(await pool._new_slot())
+
+        asyncio.run(start())
+        return pool
+
+    def test_renders_into_http_cache(self, tmp_path):
+        cache = DiskCache(str(tmp_path))
+        browser = FakeBrowser()
+        pool = self._pool(cache, browser)
+
+        url = "https://example.com/1"
+        html_docs = [asyncio.run(pool.render(url)) for _ in range(2)]
+
+        assert html_docs == ["<html><body>https://example.com/1</body></html>"] * 2
+        assert browser.contexts[0].page.urls == ["https://example.com/1"]
+        assert _io.http_get("https://example.com/1", cache) == html_docs[0]
+
+    def test_renders_pages_fetched_without_browser(self, tmp_path):
+        cache = DiskCache(str(tmp_path))
+        browser = FakeBrowser()
+        pool = self._pool(cache, browser)
+        url = "https://example.com/1"
+        _io.store_html(url, cache, "<html><body></body></html>")
+
+        html_doc = asyncio.run(pool.render(url))
+
+        assert html_doc == "<html><body>https://example.com/1</body></html>"
+        assert browser.contexts[0].page.urls == [url]
+        assert _io.http_get(url, cache) == html_doc
+
+    def test_recycles_contexts(self, tmp_path):
+        browser = FakeBrowser()
+        pool = self._pool(DiskCache(str(tmp_path)), browser, recycle_after=2)
+
+        urls = [f"https://example.com/{i}" for i in range(5)]
+        asyncio.run(pool.render_many(urls))
+
+        assert [len(c.page.urls) for c in browser.contexts] == [2, 2, 1]
+        assert [c.closed for c in browser.contexts] == [True, True, False]
+
+    def test_blocks_heavy_resources(self, tmp_path):
+        browser = FakeBrowser()
+        self._pool(DiskCache(str(tmp_path)), browser)
+        routes = [FakeRoute(type_) for type_ in ["document", "script", "image"]]
+
+        async def route_all() -> None:
+            for route in routes:
+                await browser.contexts[0].handler(route)
+
+        asyncio.run(route_all())
+
+        assert [r.result for r in routes] == ["continued", "continued", "aborted"]
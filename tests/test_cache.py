@@ -0,0 +1,97 @@
+from datetime import timedelta
+import gc
+from pathlib import Path
+import weakref
+
+from genxpath._cache import Cache, CacheEntry
+
+
+class TestCache:
+    def test_reload(self, tmp_path: Path):
+        path = str(tmp_path / "cache.json")
+        with Cache.load(path) as cache:
+            cache.set("a", "1", timedelta(hours=1))
+            cache.set("b", "2", timedelta(hours=1))
+            cache.set("a", "3", timedelta(hours=1))
+
+        cache = Cache.load(path)
+
+        assert cache.get("a") == "3"
+        assert cache.get("b") == "2"
+
+    def test_writes_are_batched(self, tmp_path: Path):
+        path = tmp_path / "cache.json"
+        cache = Cache.load(str(path), flush_every=3, flush_interval=timedelta(hours=1))
+
+        cache.set("a", "1", timedelta(hours=1))
+        cache.set("b", "2", timedelta(hours=1))
+        assert not path.exists()
+
+        cache.set("c", "3", timedelta(hours=1))
+        assert len(path.read_text().splitlines()) == 3
+
+    def test_expired_entries_are_dropped(self, tmp_path: Path):
+        path = str(tmp_path / "cache.json")
+        with Cache.load(path) as cache:
+            cache.set("a", "1", timedelta(seconds=-1))
+            cache.set("b", "2", timedelta(hours=1))
+
+        cache = Cache.load(path)
+
+        assert cache.get("a") is None
+        assert list(cache.data) == ["b"]
+
+    def test_pending_records_are_written_when_collected(self, tmp_path: Path):
+        path = str(tmp_path / "cache.json")
+        cache = Cache.load(path, flush_interval=timedelta(hours=1))
+        cache.set("a", "1", timedelta(hours=1))
+        cache_ref = weakref.ref(cache)
+
+        del cache
+        gc.collect()
+
+        assert cache_ref() is None
+        assert Cache.load(path).get("a") == "1"
+
+    def test_pending_records_of_constructed_caches_are_written(self, tmp_path: Path):
+        path = tmp_path / "cache.json"
+        cache = Cache(data={}, path=path, flush_interval=timedelta(hours=1))
+        cache.set("a", "1", timedelta(hours=1))
+
+        del cache
+        gc.collect()
+
+        assert Cache.load(str(path)).get("a") == "1"
+
+    def test_compaction(self, tmp_path: Path):
+        path = tmp_path / "cache.json"
+        with Cache.load(str(path)) as cache:
+            for i in range(3000):
+                cache.set(str(i % 10), str(i), timedelta(hours=1))
+
+        assert len(path.read_text().splitlines()) < 1024 * 2
+        assert Cache.load(str(path)).get("9") == "2999"
+
+    def test_max_entries(self, tmp_path: Path):
+        path = str(tmp_path / "cache.json")
+        with Cache.load(path, max_entries=10) as cache:
+            for i in range(20):
+                cache.set(str(i), str(i), timedelta(hours=1 + i))
+
+        cache = Cache.load(path)
+
+        assert len(cache.data) <= 10
+        assert cache.get("19") == "19"
+        assert cache.get("0") is None
+
+    def test_reads_whole_file_json(self, tmp_path: Path):
+        path = tmp_path / "cache.json"
+        old_cache = Cache(
+            data={"a": CacheEntry(value="1", expires_at=2**40)}, path=path
+        )
+        path.write_bytes(old_cache.model_dump_json(indent=2).encode("utf-8"))
+
+        cache = Cache.load(str(path))
+
+        assert cache.get("a") == "1"
+        assert path.read_text().startswith('{"')
@@ -0,0 +1,23 @@
+from genxpath._docs import DocumentCache
+
+
+class TestDocumentCache:
+    def test_same_html_is_parsed_once(self):
+        docs = DocumentCache(max_bytes=1024 * 1024)
+
+        doc = docs.parse("<html><body><p>1</p></body></html>")
+
+        assert docs.parse("<html><body><p>1</p></body></html>") is doc
+        assert docs.parse("<html><body><p>2</p></body></html>") is not doc
+
+    def test_evicts_least_recently_used(self):
+        html_docs = [f"<html><body><p>{i}</p></body></html>" for i in range(3)]
+        docs = DocumentCache(max_bytes=len(html_docs[0]) * 10 * 2)
+
+        first = docs.parse(html_docs[0])
+        second = docs.parse(html_docs[1])
+        assert docs.parse(html_docs[0]) is first
+        docs.parse(html_docs[2])
+
+        assert docs.parse(html_docs[0]) is first
+        assert docs.parse(html_docs[1]) is not second
@@ -0,0 +1,58 @@
+from parsel import Selector
+import pytest
+
+from genxpath._dom_sync import DomSyncError, apply_dom_changes
+from genxpath._gen import find_xpaths_for
+
+
+class TestApplyDomChanges:
+    def test_applies_changes_in_order(self):
+        doc = Selector(
+            text="<html><body><ul><li>a</li></ul><p>old <b>x</b></p></body></html>"
+        )
+
+        apply_dom_changes(
+            doc,
+            [
+                {"op": "insert", "path": [0], "index": 0, "html": "<div></div>"},
+                {"op": "attrs", "path": [0, 1], "attrs": {"class": "list"}},
+                {"op": "insert", "path": [0, 1], "index": 1, "html": "<li>b</li>"},
+                {"op": "insert", "path": [0, 1], "index": 2, "html": "<li x=1>c</li>"},
+                {"op": "children", "path": [0, 2], "html": "new <i>y</i> z"},
+            ],
+        )
+
+        assert doc.xpath("//body").get() == (
+            '<body><div></div><ul class="list"><li>a</li><li>b</li><li x="1">c</li>'
+            "</ul><p>new <i>y</i> z</p></body>"
+        )
+
+    def test_skips_comments_in_paths(self):
+        doc = Selector(
+            text="<html><head></head><body><!-- c --><p>1</p><p>2</p></body></html>"
+        )
+
+        apply_dom_changes(
+            doc, [{"op": "insert", "path": [1], "index": 1, "html": "<p>3</p>"}]
+        )
+
+        assert doc.xpath("//p/text()").getall() == ["1", "3", "2"]
+
+    def test_drops_stale_index(self):
+        doc = Selector(text="<html><body><p>old</p></body></html>")
+        assert find_xpaths_for("old", doc) == ["/html/body/p/text()"]
+
+        apply_dom_changes(
+            doc, [{"op": "children", "path": [0, 0], "html": "<span>new</span>"}]
+        )
+
+        assert find_xpaths_for("new", doc) == ["/html/body/p/span/text()"]
+        assert find_xpaths_for("old", doc) == []
+
+    def test_fails_on_missing_element(self):
+        doc = Selector(text="<html><body><p>1</p></body></html>")
+
+        with pytest.raises(DomSyncError):
+            apply_dom_changes(
+                doc, [{"op": "attrs", "path": [0, 3], "attrs": {"id": "x"}}]
+            )
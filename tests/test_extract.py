@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+
+from genxpath._extract import Extractor, extract_many
+from genxpath._gen import find_xpaths
+
+
+def _page(i: int) -> str:
+    return f"""
+    <html><body>
+    <h1 id="title">Product {i}</h1>
+    <span class="price" data-sku="sku-{i}">€{i}.99</span>
+    </body></html>
+    """
+
+
+class TestExtractor:
+    def test_extracts_with_found_xpaths(self):
+        model = {"title": "Product 1", "price": "€1.99"}
+        extractor = Extractor(find_xpaths(model, _page(1)))
+
+        assert extractor.extract(_page(2)) == {"title": "Product 2", "price": "€2.99"}
+
+    def test_falls_back_to_later_xpaths(self):
+        extractor = Extractor(
+            {"sku": ["//*[@id='sku']/text()", "//*[@class='price']/@data-sku"]}
+        )
+
+        assert extractor.extract(_page(3)) == {"sku": "sku-3"}
+        assert extractor.extract("<html></html>") == {"sku": None}
+
+    def test_invalid_xpath(self):
+        with pytest.raises(ValueError):
+            Extractor({"title": ["//h1["]})
+
+
+class TestExtractMany:
+    def test_records_are_in_input_order(self, tmp_path: Path):
+        paths = list[str | Path]()
+        for i in range(40):
+            path = tmp_path / f"{i}.html"
+            path.write_text(_page(i))
+            paths.append(path)
+        paths.insert(5, tmp_path / "missing.html")
+
+        records = list(
+            extract_many(
+                {"title": ["//*[@id='title']/text()"]}, paths, workers=2, chunksize=3
+            )
+        )
+
+        assert isinstance(records.pop(5), FileNotFoundError)
+        assert records == [{"title": f"Product {i}"} for i in range(40)]
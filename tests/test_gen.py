@@ -1,11 +1,29 @@
+import gc
+from pathlib import Path
+import weakref
+
+import lxml.html
 import pytest
-from genxpath._gen import find_xpaths, minimize_xpath
+from parsel import Selector
+
+from genxpath._docs import content_hash, documents
+from genxpath._gen import (
+    _find_xpaths_job,
+    find_xpaths,
+    find_xpaths_batch,
+    find_xpaths_for,
+    iter_xpaths_for,
+    minimize_xpath,
+)
+from genxpath._index import doc_index
+from genxpath._ngrams import ngram_index
+from genxpath._query import query_xpath
 from cache3 import DiskCache
 
 
 @pytest.fixture
-def cache() -> DiskCache:
-    return DiskCache("cache")
+def cache(tmp_path: Path) -> DiskCache:
+    return DiskCache(str(tmp_path / "cache"))
 
 
 class TestFindXpaths:
@@ -25,6 +43,29 @@ class TestFindXpaths:
 
         assert xpaths["price"] == ["//*[@id='sales-price']/text()"]
 
+    def test_anchor_values_with_quotes(self):
+        html_doc = """
+        <html><body>
+        <div class="it's"><span>€199.99</span></div>
+        <div id='say "hi"'><span>€299.99</span></div>
+        <div class='it&apos;s "new"'><span>€399.99</span></div>
+        </body></html>
+        """
+        model = {"a": "€199.99", "b": "€299.99", "c": "€399.99"}
+
+        short = find_xpaths(model, html_doc)
+        fast = find_xpaths(model, html_doc, prefer="fast")
+
+        assert short == {
+            "a": ['//*[@class="it\'s"]/span/text()'],
+            "b": ["//*[@id='say \"hi\"']/span/text()"],
+            "c": ["//*[@class=concat('it', \"'\", 's \"new\"')]/span/text()"],
+        }
+        doc = Selector(text=html_doc)
+        for field, value in model.items():
+            assert doc.xpath(short[field][0]).getall() == [value]
+            assert doc.xpath(fast[field][0]).getall() == [value]
+
     def test_in_attr(self):
         html_doc = """
         <html><body>
@@ -53,6 +94,184 @@ class TestFindXpaths:
 
         assert xpaths["price"] == ["//*[@class='price']/span/text()"]
 
+    def test_text_after_child_element(self):
+        html_doc = """
+        <html><body>
+        <p class="old"><s>was</s>199.99</p>
+        <p class="new">199.99</p>
+        </body></html>
+        """
+
+        xpaths = find_xpaths({"price": "199.99"}, html_doc)
+
+        assert xpaths["price"] == [
+            "//*[@class='old']/text()",
+            "//*[@class='new']/text()",
+        ]
+
+    def test_skips_attrs_that_are_not_unique(self):
+        html_doc = """
+        <html><body>
+        <div class="product" data-testid="product-1">
+            <span class="price">199.99</span>
+        </div>
+        <div class="product">
+            <span class="price">299.99</span>
+        </div>
+        </body></html>
+        """
+
+        xpaths = find_xpaths({"price": "199.99"}, html_doc)
+
+        assert xpaths["price"] == ["//*[@data-testid='product-1']/span/text()"]
+
+    def test_many_fields(self):
+        html_doc = """
+        <html><body>
+        <div class="product">
+            <h1 itemprop="name">Trek Fx 1</h1>
+            <span class="price" data-price="199.99">
+                €199.99
+            </span>
+        </div>
+        </body></html>
+        """
+
+        xpaths = find_xpaths(
+            {"name": "Trek Fx 1", "price": "€199.99", "missing": "nope", "empty": ""},
+            html_doc,
+        )
+
+        assert xpaths == {
+            "name": ["//*[@itemprop='name']/text()"],
+            "price": ["//*[@class='price']/text()"],
+            "missing": [],
+            "empty": [],
+        }
+
+    def test_without_unique_attrs_falls_back_to_absolute_path(self):
+        html_doc = """
+        <html><body>
+        <div><span>199.99</span></div>
+        <div><span>299.99</span></div>
+        </body></html>
+        """
+
+        xpaths = find_xpaths({"price": "199.99"}, html_doc)
+
+        assert xpaths["price"] == ["/html/body/div[1]/span/text()"]
+
+    def test_deep_document(self):
+        depth = 50
+        html_doc = (
+            '<html><body><main id="app">'
+            + "<div>" * depth
+            + "<span>199.99</span><span>299.99</span>"
+            + "</div>" * depth
+            + "</main></body></html>"
+        )
+
+        xpaths = find_xpaths({"price": "299.99"}, html_doc)
+
+        assert xpaths["price"] == [
+            "//*[@id='app']" + "/div" * depth + "/span[2]/text()"
+        ]
+
+
+class TestFindXpathsBatch:
+    def test_results_are_in_input_order(self, tmp_path):
+        jobs = []
+        for i in range(5):
+            html_doc = f'<html><body><span id="price-{i}">{i}.99</span></body></html>'
+            if i % 2:
+                path = tmp_path / f"{i}.html"
+                path.write_text(html_doc)
+                jobs.append(({"price": f"{i}.99"}, path))
+            else:
+                jobs.append(({"price": f"{i}.99"}, html_doc))
+
+        results = list(find_xpaths_batch(jobs, workers=2))
+
+        assert results == [
+            {"price": [f"//*[@id='price-{i}']/text()"]} for i in range(5)
+        ]
+
+    def test_jobs_dont_fill_the_document_cache(self):
+        html_doc = '<html><body><span id="price">9.99</span></body></html>'
+
+        assert _find_xpaths_job(({"price": "9.99"}, html_doc)) == {
+            "price": ["//*[@id='price']/text()"]
+        }
+        assert documents.get(content_hash(html_doc)) is None
+
+
+class TestIterXpathsFor:
+    def test_yields_same_xpaths_as_find_xpaths_for(self):
+        doc = Selector(
+            text="""
+            <html><body>
+            <p id="a">199.99</p>
+            <p data-price="199.99">199.99</p>
+            </body></html>
+            """
+        )
+
+        xpaths = iter_xpaths_for("199.99", doc)
+
+        assert next(xpaths) == "//*[@id='a']/text()"
+        assert list(xpaths) == find_xpaths_for("199.99", doc)[1:]
+
+
+class TestFindXpathsForMatch:
+    doc = Selector(
+        text="""
+        <html><body>
+        <p id="old">Was: 199,99</p>
+        <p id="price">Price: €199.99 <b>incl.</b> VAT</p>
+        <a id="buy" title="Buy for 199.99">Buy</a>
+        <script>var price = "199.99";</script>
+        </body></html>
+        """
+    )
+
+    def test_exact_misses_partial_values(self):
+        assert find_xpaths_for("199.99", self.doc) == []
+
+    def test_contains(self):
+        assert find_xpaths_for("199.99", self.doc, match="contains") == [
+            "//*[@id='price']/text()[1]",
+            "//*[@id='buy']/@title",
+        ]
+
+    def test_contains_text_after_child_element(self):
+        assert find_xpaths_for("VAT", self.doc, match="contains") == [
+            "//*[@id='price']/text()[2]"
+        ]
+
+    def test_contains_selects_the_matching_text_node(self):
+        doc = Selector(
+            text='<div id="price">Now only <b>x</b> 199 EUR <br> incl. VAT</div>'
+        )
+
+        xpaths = find_xpaths_for("199", doc, match="contains")
+
+        assert xpaths == ["//*[@id='price']/text()[2]"]
+        assert doc.xpath(xpaths[0]).get() == " 199 EUR "
+
+    def test_contains_in_the_only_text_node(self):
+        doc = Selector(text='<p id="old">Was: 199,99</p>')
+
+        assert find_xpaths_for("199", doc, match="contains") == [
+            "//*[@id='old']/text()"
+        ]
+
+    def test_fuzzy_finds_closest_first(self):
+        # One edit away from the price, two from the old price.
+        assert find_xpaths_for("E: €199,99", self.doc, match="fuzzy") == [
+            "//*[@id='price']/text()[1]",
+            "//*[@id='old']/text()",
+        ]
+
 
 class TestMinimizeXpath:
     def test_by_id(self, cache: DiskCache):
@@ -88,3 +307,64 @@ class TestMinimizeXpath:
         min_xpath = minimize_xpath(html_doc, "/html/body/div/span[2]/text()")
 
         assert min_xpath == "//*[@id='sales-price']/text()"
+
+    def test_invalid_xpath(self):
+        with pytest.raises(ValueError):
+            minimize_xpath("<html><body></body></html>", "//div[")
+
+
+class TestFindXpathsForPreferFast:
+    doc = Selector(
+        text="""
+        <html><body>
+        <div id="product">
+            <h2 class="title">Phone</h2>
+            <div><span class="price">€199.99</span></div>
+        </div>
+        <ul><li class="sku">A-123</li><li>B-456</li></ul>
+        </body></html>
+        """
+    )
+
+    def test_looks_up_ids_instead_of_scanning(self):
+        assert find_xpaths_for("Phone", self.doc) == ["//*[@class='title']/text()"]
+        assert find_xpaths_for("Phone", self.doc, prefer="fast") == [
+            "id('product')/h2/text()"
+        ]
+
+    def test_id_further_up_over_closer_scan(self):
+        assert find_xpaths_for("€199.99", self.doc, prefer="fast") == [
+            "id('product')/div/span/text()"
+        ]
+
+    def test_scans_without_ids(self):
+        assert find_xpaths_for("A-123", self.doc, prefer="fast") == [
+            "//*[@class='sku']/text()"
+        ]
+
+    def test_scans_for_ids_inserted_in_place(self):
+        doc = Selector(text="<html><body><p>Phone</p></body></html>")
+        # libxml2 doesn't register ids of elements inserted after parsing.
+        doc.root.find("body").append(
+            lxml.html.fragment_fromstring('<p id="new">New</p>')
+        )
+        assert find_xpaths_for("New", doc, prefer="fast") == ["//*[@id='new']/text()"]
+
+    def test_xpaths_select_the_value(self):
+        for value in ("Phone", "€199.99", "A-123", "B-456"):
+            [xpath] = find_xpaths_for(value, self.doc, prefer="fast")
+            assert self.doc.xpath(xpath).get("").strip() == value
+
+
+class TestIndexLifetime:
+    def test_indexes_are_freed_with_the_document(self):
+        doc = Selector(text='<html lang="en"><body><p id="p">€199.99</p></body></html>')
+        find_xpaths_for("€199.99", doc, prefer="fast")
+        find_xpaths_for("199", doc, match="contains")
+        query_xpath(doc, "/html")
+        indexes = [weakref.ref(doc_index(doc)), weakref.ref(ngram_index(doc))]
+
+        del doc
+        gc.collect()
+
+        assert [index() for index in indexes] == [None, None]
@@ -0,0 +1,27 @@
+from parsel import Selector
+
+from genxpath import gui
+from genxpath.gui import _SourceLines
+
+
+class TestSourceLines:
+    def test_finds_element_on_minified_line(self):
+        html_doc = "<html><body>" + "<p>1</p>" * 3000 + "</body></html>"
+        source = _SourceLines.index(html_doc)
+        el = Selector(text=html_doc).xpath("//p[2001]")[0].root
+
+        offset = source.start_tag_offset(el) or 0
+
+        assert offset == len("<html><body>") + 2000 * len("<p>1</p>")
+        assert source.rows == 25
+        assert source.position(offset) == divmod(offset, gui._ROW_CHARS)
+
+    def test_finds_element_after_leading_newlines(self):
+        html_doc = '\n\n<html><body>\n<p>1</p>\n<p id="x">2</p>\n</body></html>'
+        source = _SourceLines.index(html_doc)
+        el = Selector(text=html_doc).xpath("//*[@id='x']")[0].root
+
+        row, column = source.position(source.start_tag_offset(el) or 0)
+
+        assert (row, column) == (4, 0)
+        assert source.row_text(row) == '<p id="x">2</p>'
@@ -0,0 +1,137 @@
+import asyncio
+from dataclasses import dataclass, field
+import time
+
+import pytest
+from cache3 import DiskCache
+
+from genxpath import _io
+
+
+@dataclass
+class FakeStatus:
+    code: int
+
+    def as_int(self) -> int:
+        return self.code
+
+
+@dataclass
+class FakeResponse:
+    status: FakeStatus
+    body: str
+    headers: dict[str, bytes] = field(default_factory=dict)
+
+    def text(self) -> str:
+        return self.body
+
+
+class FakeClient:
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+        self.requests = list[tuple[str, dict[str, str]]]()
+
+    def get(self, url: str, headers: dict[str, str]) -> FakeResponse:
+        self.requests.append((url, headers))
+        return self.responses.pop(0)
+
+
+class FakeAsyncResponse(FakeResponse):
+    async def text(self) -> str:  # type: ignore[override]
+        return self.body
+
+
+class FakeAsyncClient:
+    def __init__(self, *responses: FakeResponse):
+        self._client = FakeClient(*responses)
+
+    async def get(self, url: str, headers: dict[str, str]) -> FakeAsyncResponse:
+        resp = self._client.get(url, headers)
+        return FakeAsyncResponse(resp.status, resp.body, resp.headers)
+
+
+@pytest.fixture
+def cache(tmp_path) -> DiskCache:
+    return DiskCache(str(tmp_path))
+
+
+def _expire(cache: DiskCache, url: str) -> None:
+    page = cache.get(url)
+    cache.set(url, {**page, "fetched_at": time.time() - 2 * 24 * 3600})
+
+
+class TestHttpGet:
+    def test_fresh_page_is_served_from_cache(self, cache: DiskCache, monkeypatch):
+        client = FakeClient(FakeResponse(FakeStatus(200), "<html>1</html>"))
+        monkeypatch.setattr(_io, "_client", lambda: client)
+
+        assert _io.http_get("https://local.test/", cache) == "<html>1</html>"
+        assert _io.http_get("https://local.test/", cache) == "<html>1</html>"
+        assert len(client.requests) == 1
+
+    def test_stale_page_is_revalidated(self, cache: DiskCache, monkeypatch):
+        client = FakeClient(
+            FakeResponse(FakeStatus(200), "<html>1</html>", {"etag": b'"v1"'}),
+            FakeResponse(FakeStatus(304), ""),
+        )
+        monkeypatch.setattr(_io, "_client", lambda: client)
+
+        _io.http_get("https://local.test/", cache)
+        _expire(cache, "https://local.test/")
+
+        assert _io.http_get("https://local.test/", cache) == "<html>1</html>"
+        assert client.requests[1] == ("https://local.test/", {"If-None-Match": '"v1"'})
+
+    def test_error_pages_are_not_cached(self, cache: DiskCache, monkeypatch):
+        client = FakeClient(FakeResponse(FakeStatus(500), "oops"))
+        monkeypatch.setattr(_io, "_client", lambda: client)
+
+        with pytest.raises(_io.FetchError):
+            _io.http_get("https://local.test/", cache)
+        assert cache.get("https://local.test/") is None
+
+    def test_identical_pages_are_stored_once(self, cache: DiskCache, monkeypatch):
+        html_doc = "<html>" + "<p>same</p>" * 1000 + "</html>"
+        client = FakeClient(
+            FakeResponse(FakeStatus(200), html_doc),
+            FakeResponse(FakeStatus(200), html_doc),
+        )
+        monkeypatch.setattr(_io, "_client", lambda: client)
+
+        _io.http_get("https://local.test/a", cache)
+        _io.http_get("https://local.test/b", cache)
+
+        bodies = [k for k, _ in cache.keys() if k.startswith("body:")]
+        assert len(bodies) == 1
+        assert len(cache.get(bodies[0])) < len(html_doc) / 5
+        assert _io.http_get("https://local.test/b", cache) == html_doc
+
+    def test_rendered_pages_are_not_fetched_again(self, cache: DiskCache, monkeypatch):
+        monkeypatch.setattr(_io, "_client", lambda: FakeClient())
+        _io.store_html("https://local.test/", cache, "<html>JS</html>", rendered=True)
+        _expire(cache, "https://local.test/")
+
+        assert _io.http_get("https://local.test/", cache) == "<html>JS</html>"
+        assert _io.cached_html("https://local.test/", cache, rendered=True) is None
+
+    def test_reads_plain_html_entries(self, cache: DiskCache):
+        cache.set("https://local.test/", "<html>old</html>")
+
+        assert _io.http_get("https://local.test/", cache) == "<html>old</html>"
+
+
+class TestFetchMany:
+    def test_results_in_input_order(self, cache: DiskCache, monkeypatch):
+        urls = [f"https://local.test/{i}" for i in range(3)]
+        client = FakeAsyncClient(
+            FakeResponse(FakeStatus(200), "0"),
+            FakeResponse(FakeStatus(404), ""),
+            FakeResponse(FakeStatus(200), "2"),
+        )
+        monkeypatch.setattr(_io, "_async_client", lambda: client)
+
+        results = asyncio.run(_io.fetch_many(urls, cache, max_per_host=1))
+
+        assert results[0] == "0"
+        assert isinstance(results[1], _io.FetchError)
+        assert results[2] == "2"
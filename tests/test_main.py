@@ -0,0 +1,9 @@
+import typing as t
+
+from genxpath.__main__ import WaitUntilChoice
+from genxpath._browser import WaitUntil
+
+
+class TestWaitUntilChoice:
+    def test_has_every_load_state(self):
+        assert [c.value for c in WaitUntilChoice] == list(t.get_args(WaitUntil))
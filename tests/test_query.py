@@ -0,0 +1,57 @@
+from threading import Event
+
+from parsel import Selector
+
+from genxpath import _stats
+from genxpath._dom_sync import apply_dom_changes
+from genxpath._query import LiveQuery, memoized_query, query_xpath
+
+
+class TestQueryXpath:
+    def test_remembers_results(self):
+        doc = Selector(text="<html><body><p>1</p><p>2</p></body></html>")
+        stats = _stats.enable()
+        try:
+            first = query_xpath(doc, "//p/text()")
+            again = query_xpath(doc, "//p/text()")
+        finally:
+            _stats.disable()
+
+        assert first == ["1", "2"]
+        assert again is first
+        assert stats.timings["xpath"].count == 1
+        assert query_xpath(doc, "count(//p)") == [2.0]
+
+    def test_forgets_results_once_document_changes(self):
+        doc = Selector(text="<html><head></head><body><p>1</p></body></html>")
+        query_xpath(doc, "//p")
+
+        apply_dom_changes(
+            doc, [{"op": "insert", "path": [1], "index": 1, "html": "<p>2</p>"}]
+        )
+
+        assert memoized_query(doc, "//p") is None
+        assert len(query_xpath(doc, "//p")) == 2
+
+
+class TestLiveQuery:
+    def test_reports_only_latest_xpath(self):
+        doc = Selector(text="<html><body><p>1</p></body></html>")
+        results = list[tuple[str, int | str]]()
+        done = Event()
+
+        def on_result(xpath: str, result: list | ValueError) -> None:
+            results.append(
+                (xpath, "invalid" if isinstance(result, ValueError) else len(result))
+            )
+            done.set()
+
+        live = LiveQuery(doc, on_result, delay=0.05)
+        live.update("//")
+        live.update("//p")
+        assert done.wait(5)
+        done.clear()
+        live.update("//p[")
+        assert done.wait(5)
+
+        assert results == [("//p", 1), ("//p[", "invalid")]
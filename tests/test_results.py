@@ -0,0 +1,29 @@
+from parsel import Selector
+
+from genxpath._query import query_xpath
+from genxpath._results import ResultSet
+
+
+class TestResultSet:
+    def test_pages(self):
+        doc = Selector(text="<html><body>" + "<p>1</p>" * 120 + "</body></html>")
+
+        results = ResultSet(query_xpath(doc, "//p"))
+
+        assert len(results) == 120
+        assert results.page(0, size=2) == [(0, "<p>1</p>"), (1, "<p>1</p>")]
+        assert [i for i, _ in results.page(100)] == list(range(100, 120))
+        assert results.page(120) == []
+
+    def test_truncates_long_rows(self):
+        html_doc = (
+            '<html><body><div class="a&amp;b"><!-- x -->'
+            + "<span>1 &lt; 2</span><br>" * 1000
+            + "</div></body></html>"
+        )
+        doc = Selector(text=html_doc)
+
+        results = ResultSet(query_xpath(doc, "//div | //span/text()"), max_chars=100)
+
+        assert results.row(0) == doc.xpath("//div")[0].get()[:100] + "…"
+        assert results.row(1) == "1 < 2"
@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import pytest
+from cache3 import DiskCache
+
+from genxpath._docs import DocumentCache
+from genxpath._io import store_html
+from genxpath._session import Session
+
+
+def _html(i: int) -> str:
+    return f"<html><body><p>Page {i}</p>{'<br/>' * i}</body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> DiskCache:
+    return DiskCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def pages(tmp_path) -> list[str]:
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"page{i}.html"
+        path.write_text(_html(i))
+        paths.append(str(path))
+    return paths
+
+
+class TestSession:
+    def test_load_and_use(self, cache: DiskCache, pages: list[str]):
+        session = Session(cache, DocumentCache(max_bytes=1024 * 1024))
+
+        session.load("a", pages[0])
+        second = session.load("b", pages[1])
+        assert session.current == "b"
+        assert session.use("a").xpath("//p/text()").get() == "Page 0"
+        assert session.current == "a"
+        assert session.doc("b") is second
+
+    def test_reparses_evicted_documents(self, cache: DiskCache, pages: list[str]):
+        # Room for one parsed document only.
+        docs = DocumentCache(max_bytes=len(_html(2)) * 10)
+        session = Session(cache, docs)
+
+        first = session.load("a", pages[0])
+        session.load("b", pages[1])
+        assert not session.is_parsed("a")
+
+        doc = session.doc("a")
+        assert doc is not first
+        assert doc.xpath("//p/text()").get() == "Page 0"
+        assert not session.is_parsed("b")
+
+    def test_loads_urls_through_the_page_cache(self, cache: DiskCache):
+        url = "https://local.test/page"
+        store_html(url, cache, _html(1))
+        docs = DocumentCache(max_bytes=len(_html(1)) * 10)
+        session = Session(cache, docs)
+
+        session.load("a", url)
+        assert session.doc().xpath("//p/text()").get() == "Page 1"
+
+        docs.clear()
+        assert session.doc("a").xpath("count(//br)").get() == "1.0"
+        assert session.source("a") == url
+
+    def test_count_all(self, cache: DiskCache, pages: list[str]):
+        session = Session(cache, DocumentCache(max_bytes=200))
+        for i, page in enumerate(pages):
+            session.load(f"page{i}", page)
+
+        assert session.count_all("//br") == {"page0": 0, "page1": 1, "page2": 2}
+        with pytest.raises(ValueError):
+            session.count_all("//[")
+
+    def test_unknown_document(self, cache: DiskCache, pages: list[str]):
+        session = Session(cache)
+
+        with pytest.raises(ValueError, match="No document loaded"):
+            session.doc()
+        session.load("a", pages[0])
+        with pytest.raises(ValueError, match="No document named b"):
+            session.use("b")
@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Third-party packages every entry point may import at startup, anything else
+# must be imported only on the code paths that use it.
+IMPORT_BUDGETS = {
+    "genxpath._gen": {"lxml", "parsel"},
+    "genxpath.api": {"lxml", "parsel"},
+    "genxpath.__main__": {"lxml", "parsel", "typer"},
+    "genxpath.gui": {"cache3", "lxml", "parsel", "rich", "textual"},
+}
+
+HEAVY_DEPENDENCIES = {
+    "cache3",
+    "lxml",
+    "parsel",
+    "patchright",
+    "playwright",
+    "prompt_toolkit",
+    "pydantic",
+    "rich",
+    "rnet",
+    "textual",
+    "typer",
+}
+
+
+def _imported_packages(module: str) -> set[str]:
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import json, sys; import {module}; print(json.dumps(list(sys.modules)))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return {name.split(".")[0] for name in json.loads(out)}
+
+
+class TestImportBudget:
+    @pytest.mark.parametrize("module", IMPORT_BUDGETS)
+    def test_imports_only_budgeted_dependencies(self, module: str):
+        heavy = _imported_packages(module) & HEAVY_DEPENDENCIES
+
+        assert heavy <= IMPORT_BUDGETS[module]
@@ -0,0 +1,55 @@
+import typing as t
+
+import pytest
+
+from genxpath import _stats
+from genxpath._gen import find_xpaths, minimize_xpath
+
+
+@pytest.fixture
+def stats() -> t.Iterator[_stats.Stats]:
+    yield _stats.enable()
+    _stats.disable()
+
+
+class TestStats:
+    def test_nothing_is_collected_when_disabled(self):
+        assert _stats.active() is None
+        with _stats.span("xpath"):
+            _stats.count("ancestor_steps")
+
+        assert _stats.active() is None
+
+    def test_counts_xpath_generation(self, stats: _stats.Stats):
+        html_doc = """
+        <html><body>
+        <div id="product"><p><span>199.99</span></p></div>
+        </body></html>
+        """
+
+        find_xpaths({"price": "199.99"}, html_doc)
+        minimize_xpath(html_doc, "/html/body/div/p/span")
+
+        assert stats.timings["parse"].count == 1
+        assert stats.timings["find_xpaths_for"].count == 1
+        assert stats.timings["xpath"].count > 0
+        # Both times from span to the div with the id.
+        assert stats.counts["ancestor_steps"] == 4
+        assert stats.counts["anchor_candidates"] > 0
+
+    def test_trace_is_in_chrome_format(self, stats: _stats.Stats):
+        with _stats.span("xpath", expr="//p"):
+            _stats.count("ancestor_steps", 2)
+
+        events = stats.trace()["traceEvents"]
+
+        assert events[0]["name"] == "xpath"
+        assert events[0]["ph"] == "X"
+        assert events[0]["args"] == {"expr": "//p"}
+        assert events[1] == {
+            "name": "ancestor_steps",
+            "ph": "C",
+            "ts": events[1]["ts"],
+            "pid": events[0]["pid"],
+            "args": {"ancestor_steps": 2},
+        }
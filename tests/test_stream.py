@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from genxpath._gen import find_xpaths
+from genxpath._stream import stream_find_xpaths
+
+
+class TestStreamFindXpaths:
+    def test_same_as_find_xpaths(self, tmp_path: Path):
+        html_doc = """
+        <html><body id="catalog">
+        <div class="product" id="product">
+            <p class="price"><!-- sale -->
+                <span>199.99 eur</span>
+            </p>
+            <span class="price" data-price="199.99">€199.99</span>
+        </div>
+        <div class="product">
+            <span class="price">€299.99</span>
+            <span>199.99 eur</span>
+        </div>
+        </body></html>
+        """
+        path = tmp_path / "doc.html"
+        path.write_text(html_doc)
+        model = {"price": "199.99 eur", "raw_price": "199.99", "missing": ""}
+
+        xpaths = stream_find_xpaths(model, path)
+
+        assert {
+            field: [x.xpath for x in found] for field, found in xpaths.items()
+        } == find_xpaths(model, html_doc)
+
+    def test_anchor_values_with_quotes(self, tmp_path: Path):
+        html_doc = """
+        <html><body>
+        <div class="it's"><span>199.99 eur</span></div>
+        <div class="other"><span>299.99 eur</span></div>
+        </body></html>
+        """
+        path = tmp_path / "doc.html"
+        path.write_text(html_doc)
+        model = {"price": "199.99 eur"}
+
+        xpaths = stream_find_xpaths(model, path)
+
+        assert [x.xpath for x in xpaths["price"]] == find_xpaths(model, html_doc)[
+            "price"
+        ]
+        assert find_xpaths(model, html_doc)["price"] == [
+            '//*[@class="it\'s"]/span/text()'
+        ]
+
+    def test_abs_xpath(self, tmp_path: Path):
+        html_doc = """
+        <html><body>
+        <div><span>Trek Fx 1</span></div>
+        <div>
+            <span>Trek</span>
+            <span>Fx 1</span>
+            <b>text in tail of a removed sibling</b>300.00
+        </div>
+        </body></html>
+        """
+        path = tmp_path / "doc.html"
+        path.write_text(html_doc)
+
+        xpaths = stream_find_xpaths({"name": "Fx 1", "price": "300.00"}, path)
+
+        assert [x.abs_xpath for x in xpaths["name"]] == [
+            "/html/body/div[2]/span[2]/text()"
+        ]
+        assert xpaths["price"] == []